@@ -1,93 +1,241 @@
 import os
 import re
+import asyncio
 
 from src.stores.llm.templates.locales import en
 from .BaseController import BaseController
 from ..models.db_schemes import Project, DataChunk
 from ..stores.llm.LLMEnums import DocumentTypeEnums
-from typing import List
+from ..stores.llm.EmbeddingBatcher import EmbeddingBatcher
+from typing import List, AsyncIterator, Callable, Awaitable
 import json
 import logging
 
 class NlpController(BaseController):
     
-    def __init__(self, vector_db_client, generation_client, embedding_client, template_parser):
+    def __init__(self, vector_db_client, generation_client, embedding_client, template_parser, answer_cache=None):
         super().__init__()
         self.vector_db_client = vector_db_client
         self.generation_client = generation_client
         self.embedding_client = embedding_client
         self.template_parser = template_parser
+        # SemanticAnswerCache shared by the app, None when disabled
+        self.answer_cache = answer_cache
         self.logger = logging.getLogger(__name__)
     
     def create_collection_name(self, project_id: int) -> str:
         return f"collection_{project_id}".strip()
 
-    def reset_vector_db_collection(self, project: Project):
+    async def is_vector_db_collection_existed(self, project: Project) -> bool:
         collection_name = self.create_collection_name(project_id=project.project_id)
-        if self.vector_db_client.is_collection_existed(collection_name=collection_name):
-            return self.vector_db_client.delete_collection(collection_name=collection_name)
+        return await self.vector_db_client.is_collection_existed(collection_name=collection_name)
 
-    def get_vector_db_collection_info(self, project: Project) -> dict:
+    def invalidate_cached_answers(self, project: Project):
+        # answers were generated from the collection as it was before this change
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate(project_id=project.project_id)
+
+    async def reset_vector_db_collection(self, project: Project):
+        collection_name = self.create_collection_name(project_id=project.project_id)
+        self.invalidate_cached_answers(project=project)
+        if await self.vector_db_client.is_collection_existed(collection_name=collection_name):
+            return await self.vector_db_client.delete_collection(collection_name=collection_name)
+
+    async def get_vector_db_collection_info(self, project: Project) -> dict:
         collection_name = self.create_collection_name(project_id=project.project_id)
-        if self.vector_db_client.is_collection_existed(collection_name=collection_name):
-            collection_info = self.vector_db_client.get_collection_info(collection_name=collection_name)
+        if await self.vector_db_client.is_collection_existed(collection_name=collection_name):
+            collection_info = await self.vector_db_client.get_collection_info(collection_name=collection_name)
             # return json.loads(json.dumps(collection_info, default=lambda x: x.__dict__))
             return collection_info
 
-    def index_into_vector_db(self, project: Project, chunks: List[DataChunk], do_reset: bool = False):
+    async def index_into_vector_db(self, project: Project, chunk_batches: AsyncIterator[List[DataChunk]], do_reset: bool = False,
+                                   index_config: dict = None, on_batch_indexed: Callable[[List[int]], Awaitable] = None):
+        # chunk_batches is consumed page by page, so embedding starts before the whole project is read
+        # and memory stays bounded; returns the number of indexed chunks, or False on error
         collection_name = self.create_collection_name(project_id=project.project_id)
         if do_reset:
-            self.reset_vector_db_collection(project=project)
-        if not self.vector_db_client.is_collection_existed(collection_name=collection_name):
-            self.vector_db_client.create_collection(collection_name=collection_name, embedding_size=self.embedding_client.embedding_size)
-        
-        batch_size = 60
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:i+batch_size]
-            texts = [chunk.chunk_text for chunk in batch]
-            vectors = self.embedding_client.embed_text(text=texts, document_type=DocumentTypeEnums.DOCUMENT.value)
-            self.logger.info(f"Embedding returned {len(vectors)} vectors, for {len(texts)} texts")
-            metadatas = [chunk.chunk_metadata for chunk in batch]
-            record_ids = [chunk.chunk_id for chunk in batch]  # ✅ use DB IDs, not batch index
-            success = self.vector_db_client.insert_many(
+            await self.reset_vector_db_collection(project=project)
+        if not await self.vector_db_client.is_collection_existed(collection_name=collection_name):
+            is_created = await self.vector_db_client.create_collection(
                 collection_name=collection_name,
-                texts=texts,
-                vectors=vectors,
-                metadata=metadatas,
-                record_ids=record_ids
+                embedding_size=self.embedding_client.embedding_size,
+                index_config=index_config
             )
-
-            if not success:
+            if is_created is False:
                 return False
-        return True
+        
+        # batches are as full as the embedding provider's per-request limits allow
+        batcher = EmbeddingBatcher(max_items=self.embedding_client.embedding_max_batch_items,
+                                   max_tokens=self.embedding_client.embedding_max_batch_tokens)
+        max_concurrency = self.app_settings.EMBEDDING_MAX_CONCURRENCY or 4
+        queue_size = self.app_settings.INDEXING_QUEUE_SIZE or 8
+
+        # producer / consumer pipeline: up to max_concurrency batches are being embedded while
+        # the writer inserts finished ones, so embedding and insertion overlap instead of alternating
+        embedding_slots = asyncio.Semaphore(max_concurrency)
+        # (batch, embedding task) in chunk order, bounded so reading never runs far ahead of the writer
+        pending = asyncio.Queue(maxsize=queue_size)
+
+        async def embed_batch(batch: List[DataChunk]):
+            try:
+                texts = [chunk.chunk_text for chunk in batch]
+                return await self.embedding_client.embed_text(text=texts, document_type=DocumentTypeEnums.DOCUMENT.value)
+            finally:
+                embedding_slots.release()
 
-    def search_from_vector_db(self, project: Project, query: str, limit: int = 10):
+        async def submit(batch: List[DataChunk]):
+            await embedding_slots.acquire()
+            await pending.put((batch, asyncio.create_task(embed_batch(batch))))
+
+        async def produce():
+            try:
+                # batches span pages, only the last one of the push may be partial
+                async for chunks in chunk_batches:
+                    for chunk in chunks:
+                        batch = batcher.add(chunk, chunk.chunk_text)
+                        if batch is not None:
+                            await submit(batch)
+                batch = batcher.flush()
+                if batch is not None:
+                    await submit(batch)
+            finally:
+                # also on errors: the writer drains what was queued, then sees the error
+                await pending.put(None)
+
+        producer = asyncio.create_task(produce())
+        indexed_count = 0
+        try:
+            while (item := await pending.get()) is not None:
+                batch, embedding = item
+                vectors = await embedding
+                texts = [chunk.chunk_text for chunk in batch]
+                if not vectors or len(vectors) != len(texts):
+                    self.logger.error(f"Error embedding {len(texts)} chunks of '{collection_name}'")
+                    return False
+                self.logger.info(f"Embedding returned {len(vectors)} vectors, for {len(texts)} texts")
+                metadatas = [chunk.chunk_metadata for chunk in batch]
+                record_ids = [chunk.chunk_id for chunk in batch]  # ✅ use DB IDs, not batch index
+                asset_ids = [chunk.chunk_asset_id for chunk in batch]
+                # insert_many upserts, so re-pushing a project replaces vectors instead of duplicating them
+                success = await self.vector_db_client.insert_many(
+                    collection_name=collection_name,
+                    texts=texts,
+                    vectors=vectors,
+                    metadata=metadatas,
+                    record_ids=record_ids,
+                    asset_ids=asset_ids
+                )
+
+                if not success:
+                    return False
+                self.invalidate_cached_answers(project=project)
+                if on_batch_indexed is not None:
+                    # batches are written in chunk order, so progress is always a contiguous prefix
+                    # and a failed push resumes where it stopped
+                    await on_batch_indexed(record_ids)
+                indexed_count += len(batch)
+            # re-raises errors from reading the chunks
+            await producer
+        except Exception as e:
+            self.logger.error(f"Error indexing into '{collection_name}': {e}")
+            return False
+        finally:
+            # on early exit, stop reading and drop the embeddings nobody will insert
+            producer.cancel()
+            tasks = [producer]
+            while not pending.empty():
+                item = pending.get_nowait()
+                if item is not None:
+                    item[1].cancel()
+                    tasks.append(item[1])
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return indexed_count
+
+    async def delete_from_vector_db(self, project: Project, asset_id: int = None, chunk_ids: List[int] = None):
         collection_name = self.create_collection_name(project_id=project.project_id)
-        if not self.vector_db_client.is_collection_existed(collection_name=collection_name):
+        if not await self.vector_db_client.is_collection_existed(collection_name=collection_name):
             self.logger.error(f"Collection '{collection_name}' does not exist")
             return False
+
+        self.invalidate_cached_answers(project=project)
+        if asset_id is not None:
+            if not await self.vector_db_client.delete_by_asset(collection_name=collection_name, asset_id=asset_id):
+                return False
+        if chunk_ids:
+            if not await self.vector_db_client.delete_by_ids(collection_name=collection_name, record_ids=chunk_ids):
+                return False
+        return True
+
+    async def embed_query(self, query: str):
         # This will now return a list containing one item: [[...]]
-        list_of_vectors = self.embedding_client.embed_text(text=query, document_type=DocumentTypeEnums.QUERY.value)
+        list_of_vectors = await self.embedding_client.embed_text(text=query, document_type=DocumentTypeEnums.QUERY.value)
 
         if not list_of_vectors:
             self.logger.error(f"Error embedding query: {query}")
-            return False
+            return None
 
         # FIX: Extract the single vector from the list
-        query_vector = list_of_vectors[0]
+        return list_of_vectors[0]
 
-        results = self.vector_db_client.search_by_vector(collection_name=collection_name, vector=query_vector, limit=limit)
+    async def search_from_vector_db(self, project: Project, query: str, limit: int = 10, search_params: dict = None, filters: dict = None,
+                                    query_vector: list = None):
+        collection_name = self.create_collection_name(project_id=project.project_id)
+        if not await self.vector_db_client.is_collection_existed(collection_name=collection_name):
+            self.logger.error(f"Collection '{collection_name}' does not exist")
+            return False
+        if query_vector is None:
+            query_vector = await self.embed_query(query=query)
+            if query_vector is None:
+                return False
+
+        results = await self.vector_db_client.search_by_vector(collection_name=collection_name, vector=query_vector, limit=limit, search_params=search_params, filters=filters)
         if results == None:
             self.logger.error(f"Error searching in Vector DB: {query}")
             return False
         return results
 
-    def answer_rag_question(self, project: Project, question: str, limit : int = 10):
+    async def search_batch_from_vector_db(self, project: Project, queries: List[str], limit: int = 10, search_params: dict = None, filters: dict = None):
+        collection_name = self.create_collection_name(project_id=project.project_id)
+        if not await self.vector_db_client.is_collection_existed(collection_name=collection_name):
+            self.logger.error(f"Collection '{collection_name}' does not exist")
+            return False
+
+        # one embedding call for all queries
+        query_vectors = await self.embedding_client.embed_text(text=queries, document_type=DocumentTypeEnums.QUERY.value)
+        if not query_vectors or len(query_vectors) != len(queries):
+            self.logger.error(f"Error embedding {len(queries)} queries")
+            return False
+
+        results = await self.vector_db_client.search_by_vectors(collection_name=collection_name, vectors=query_vectors, limit=limit, search_params=search_params, filters=filters)
+        if results == None:
+            self.logger.error(f"Error searching in Vector DB for {len(queries)} queries")
+            return False
+        return results
+
+    async def answer_rag_question(self, project: Project, question: str, limit : int = 10, search_params: dict = None, filters: dict = None):
+        # returns (answer, full_prompt, chat_history, cache_hit)
         answer, full_prompt, chat_history = None, None, None
-        search_results = self.search_from_vector_db(project=project, query=question, limit=limit)
+        query_vector, options_key, cache_version, generation = None, None, None, None
+        if self.answer_cache is not None:
+            # near-identical questions asked with the same search options share one answer
+            query_vector = await self.embed_query(query=question)
+            if query_vector is None:
+                return answer, full_prompt, chat_history, False
+            options_key = self.answer_cache.options_key(limit=limit, search_params=search_params, filters=filters)
+            # catches writes made by other workers, which don't invalidate this worker's cache
+            generation = await self.vector_db_client.get_collection_generation(
+                collection_name=self.create_collection_name(project_id=project.project_id))
+            cached_answer = self.answer_cache.get(project_id=project.project_id, options_key=options_key, query_vector=query_vector,
+                                                  generation=generation)
+            if cached_answer is not None:
+                return (*cached_answer, True)
+            cache_version = self.answer_cache.version(project_id=project.project_id)
+
+        search_results = await self.search_from_vector_db(project=project, query=question, limit=limit, search_params=search_params, filters=filters,
+                                                          query_vector=query_vector)
         if not search_results:
             self.logger.error(f"No search results found for question: {question}")
-            return answer, full_prompt, chat_history
+            return answer, full_prompt, chat_history, False
 
         # Create the system prompt for the generation model
         system_prompt = self.template_parser.load_template(group = "rag", key = "system_prompt")
@@ -109,9 +257,12 @@ class NlpController(BaseController):
         
         # Generate the answer using the generation client
 
-        answer = self.generation_client.generate_text(
+        answer = await self.generation_client.generate_text(
             prompt=full_prompt,
             chat_history=chat_history
         )
-        return answer, full_prompt, chat_history
+        if answer and self.answer_cache is not None:
+            self.answer_cache.put(project_id=project.project_id, options_key=options_key, query_vector=query_vector,
+                                  answer=(answer, full_prompt, chat_history), version=cache_version, generation=generation)
+        return answer, full_prompt, chat_history, False
 
@@ -1,5 +1,6 @@
 from unittest.mock import DEFAULT
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -23,6 +24,21 @@ class Settings(BaseSettings):
     GENERATION_MODEL: str = None
     EMBEDDING_MODEL: str = None
     EMBEDDING_SIZE: int = None
+    LOCAL_EMBEDDING_THREADS: Optional[int] = None
+    EMBEDDING_BATCH_MAX_ITEMS: Optional[int] = None
+    EMBEDDING_BATCH_MAX_TOKENS: Optional[int] = None
+    EMBEDDING_MAX_CONCURRENCY: Optional[int] = None
+    INDEXING_QUEUE_SIZE: Optional[int] = None
+    EMBEDDING_CACHE_PATH: Optional[str] = None
+    EMBEDDING_CACHE_MAX_SIZE_MB: Optional[int] = None
+    QUERY_EMBEDDING_CACHE_SIZE: Optional[int] = None
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: Optional[int] = None
+
+    ANSWER_CACHE_SIZE: Optional[int] = None
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: Optional[float] = None
+    ANSWER_CACHE_TTL_SECONDS: Optional[int] = None
+
+    LLM_MAX_CONNECTIONS: Optional[int] = None
 
     INPUT_DEFAULT_MAX_TOKENS: int = None
     GENERATION_DEFAULT_MAX_TOKENS: int = None
@@ -32,6 +48,41 @@ class Settings(BaseSettings):
     VECTOR_DB_PATH: str = None
     VECTOR_DB_DISTANCE_METHOD: str = None
     VECTOR_DB_TOP_K: int = None
+    VECTOR_DB_QUANTIZATION: Optional[str] = None
+    VECTOR_DB_RESCORE_FACTOR: Optional[int] = None
+    VECTOR_DB_MAX_WORKERS: Optional[int] = None
+    SEARCH_CACHE_SIZE: Optional[int] = None
+
+    QDRANT_URL: Optional[str] = None
+    QDRANT_UPLOAD_BATCH_SIZE: Optional[int] = None
+    QDRANT_UPLOAD_PARALLEL: Optional[int] = None
+    QDRANT_UPLOAD_WAIT: Optional[bool] = None
+    QDRANT_HNSW_M: Optional[int] = None
+    QDRANT_HNSW_EF_CONSTRUCT: Optional[int] = None
+    QDRANT_HNSW_EF_SEARCH: Optional[int] = None
+    QDRANT_ON_DISK: Optional[bool] = None
+    QDRANT_ON_DISK_PAYLOAD: Optional[bool] = None
+
+    FAISS_CACHE_MAX_MEMORY_MB: Optional[int] = None
+    FAISS_WAL_COMPACTION_THRESHOLD_MB: Optional[int] = None
+    FAISS_INDEX_TYPE: Optional[str] = None
+    FAISS_IVF_NLIST: Optional[int] = None
+    FAISS_PQ_M: Optional[int] = None
+    FAISS_PQ_NBITS: Optional[int] = None
+    FAISS_HNSW_M: Optional[int] = None
+    FAISS_HNSW_EF_CONSTRUCTION: Optional[int] = None
+    FAISS_TRAIN_MIN_VECTORS: Optional[int] = None
+    FAISS_NUM_SHARDS: Optional[int] = None
+    FAISS_NPROBE: Optional[int] = None
+    FAISS_HNSW_EF_SEARCH: Optional[int] = None
+
+    PGVECTOR_INDEX_TYPE: Optional[str] = None
+    PGVECTOR_HNSW_M: Optional[int] = None
+    PGVECTOR_HNSW_EF_CONSTRUCTION: Optional[int] = None
+    PGVECTOR_HNSW_EF_SEARCH: Optional[int] = None
+    PGVECTOR_IVF_LISTS: Optional[int] = None
+    PGVECTOR_IVF_PROBES: Optional[int] = None
+    PGVECTOR_TRAIN_MIN_VECTORS: Optional[int] = None
 
     DESIRED_LANGUAGE: str = None
     DEFAULT_LANGUAGE: str = None
@@ -5,6 +5,7 @@ from .routes.nlp import nlp_router
 from motor.motor_asyncio import AsyncIOMotorClient
 from .helpers.config import get_settings, Settings
 from .stores.llm.LLMProviderFactory import LLMProviderFactory
+from .stores.llm.SemanticAnswerCache import SemanticAnswerCache
 from .stores.llm.templates.template_parser import TemplateParser
 from .stores.vectordb.VectorDBProviderFactory import VectorDBProviderFactory
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
@@ -26,16 +27,27 @@ async def startup_span():
     # app.mongo_conn = AsyncIOMotorClient(app_settings.MONGODB_URL)
     # app.db_client = app.mongo_conn[app_settings.MONGODB_DATABASE]
     app.db_client = app.async_session
-    llm_factory = LLMProviderFactory(app_settings)
-    app.generation_client = llm_factory.create(app_settings.GENERATION_BACKEND)
+    # async providers, generation and embedding requests are awaited instead of blocking the worker
+    app.llm_factory = LLMProviderFactory(app_settings)
+    app.generation_client = app.llm_factory.create_async(app_settings.GENERATION_BACKEND)
     app.generation_client.set_generation_model(app_settings.GENERATION_MODEL)
-    app.embedding_client = llm_factory.create(app_settings.EMBEDDING_BACKEND)
+    app.embedding_client = app.llm_factory.create_async(app_settings.EMBEDDING_BACKEND)
     app.embedding_client.set_embedding_model(
         app_settings.EMBEDDING_MODEL, app_settings.EMBEDDING_SIZE
     )
-    vectordb_factory = VectorDBProviderFactory(app_settings)
-    app.vector_db_client = vectordb_factory.create(app_settings.VECTOR_DB_BACKEND)
-    app.vector_db_client.connect()
+    app.embedding_client = app.llm_factory.create_cached(app.embedding_client)
+    vectordb_factory = VectorDBProviderFactory(app_settings, db_client=app.db_client)
+    app.vector_db_client = vectordb_factory.create_async(app_settings.VECTOR_DB_BACKEND)
+    await app.vector_db_client.connect()
+
+    # answers to near-identical questions are reused until the project's collection changes
+    app.answer_cache = None
+    if app_settings.ANSWER_CACHE_SIZE:
+        app.answer_cache = SemanticAnswerCache(
+            similarity_threshold=app_settings.ANSWER_CACHE_SIMILARITY_THRESHOLD or 0.95,
+            max_entries=app_settings.ANSWER_CACHE_SIZE,
+            ttl_seconds=app_settings.ANSWER_CACHE_TTL_SECONDS or 3600
+        )
 
     app.template_parser = TemplateParser(language=app_settings.DESIRED_LANGUAGE, default_language=app_settings.DEFAULT_LANGUAGE)
 
@@ -43,7 +55,8 @@ async def startup_span():
 async def shutdown_span():
     # app.mongodb_client.close()
     await app.db_engine.dispose()
-    app.vector_db_client.disconnect()
+    await app.vector_db_client.disconnect()
+    await app.llm_factory.close()
 
 
 app.on_event("startup")(startup_span)
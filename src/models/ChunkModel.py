@@ -4,7 +4,7 @@ from .enums.DataBaseEnum import DataBaseEnum
 from bson import ObjectId
 from pymongo import InsertOne
 from sqlalchemy.future import select
-from sqlalchemy import func, delete
+from sqlalchemy import func, delete, update, or_
 
 class ChunkModel(BaseDataModel):
     def __init__(self, db_client: object):
@@ -50,6 +50,14 @@ class ChunkModel(BaseDataModel):
                 await session.commit()
         return result.rowcount  # Return the number of rows deleted
 
+    async def get_asset_ids_by_project_id(self, project_id: int):
+        async with self.db_client() as session:
+            async with session.begin():
+                query = select(DataChunk.chunk_asset_id).where(DataChunk.chunk_project_id == project_id).distinct()
+                result = await session.execute(query)
+                asset_ids = result.scalars().all()
+        return asset_ids
+
     async def get_chunks_by_project_id(self, project_id: int):
         async with self.db_client() as session:
             async with session.begin():
@@ -57,4 +65,57 @@ class ChunkModel(BaseDataModel):
                 result = await session.execute(query)
                 chunks = result.scalars().all()
         return chunks
-        
\ No newline at end of file
+
+    async def get_chunks_count_by_project_id(self, project_id: int):
+        async with self.db_client() as session:
+            async with session.begin():
+                query = select(func.count(DataChunk.chunk_id)).where(DataChunk.chunk_project_id == project_id)
+                result = await session.execute(query)
+                count = result.scalar()
+        return count
+
+    async def iterate_unindexed_chunks_by_project_id(self, project_id: int, embedding_model: str, page_size: int = 500):
+        # new chunks, chunks embedded with another model and chunks edited since they were indexed.
+        # keyset pagination: each page is a short query of its own, so only one page is held in memory
+        # and chunks marked as indexed meanwhile don't shift the pages
+        last_chunk_id = 0
+        while True:
+            async with self.db_client() as session:
+                async with session.begin():
+                    query = select(
+                        DataChunk.chunk_id, DataChunk.chunk_asset_id, DataChunk.chunk_text, DataChunk.chunk_metadata
+                    ).where(
+                        DataChunk.chunk_project_id == project_id,
+                        DataChunk.chunk_id > last_chunk_id,
+                        or_(
+                            DataChunk.chunk_indexed_at.is_(None),
+                            DataChunk.chunk_embedding_model.is_distinct_from(embedding_model),
+                            DataChunk.updated_at > DataChunk.chunk_indexed_at,
+                        )
+                    ).order_by(DataChunk.chunk_id).limit(page_size)
+                    result = await session.execute(query)
+                    chunks = result.all()
+            if not chunks:
+                return
+            yield chunks
+            last_chunk_id = chunks[-1].chunk_id
+
+    async def mark_chunks_indexed(self, chunk_ids: list, embedding_model: str, batch_size: int = 1000):
+        # indexed_at and the onupdate updated_at get the same now(), so marked chunks don't count as edited
+        async with self.db_client() as session:
+            async with session.begin():
+                for i in range(0, len(chunk_ids), batch_size):
+                    stmt = update(DataChunk).where(DataChunk.chunk_id.in_(chunk_ids[i:i + batch_size])).values(
+                        chunk_indexed_at=func.now(), chunk_embedding_model=embedding_model
+                    )
+                    await session.execute(stmt)
+        return len(chunk_ids)
+
+    async def reset_chunks_indexing(self, project_id: int):
+        async with self.db_client() as session:
+            async with session.begin():
+                stmt = update(DataChunk).where(DataChunk.chunk_project_id == project_id).values(
+                    chunk_indexed_at=None, chunk_embedding_model=None
+                )
+                result = await session.execute(stmt)
+        return result.rowcount
@@ -1 +1 @@
-from .minirag.schemes import Project, Asset, DataChunk, RetrievedDocument, SQLAlchemyBase
+from .minirag.schemes import Project, Asset, DataChunk, RetrievedDocument, VectorCollection, SQLAlchemyBase
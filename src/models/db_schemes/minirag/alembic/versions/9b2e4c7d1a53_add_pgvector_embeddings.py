@@ -0,0 +1,42 @@
+"""Add pgvector embeddings
+
+Revision ID: 9b2e4c7d1a53
+Revises: 3c168afa347d
+Create Date: 2026-10-18 10:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from pgvector.sqlalchemy import Vector
+
+# revision identifiers, used by Alembic.
+revision: str = '9b2e4c7d1a53'
+down_revision: Union[str, None] = '3c168afa347d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS vector')
+    # no fixed dimension: ANN indexes are built per project on a cast to the collection's size
+    op.add_column('data_chunks', sa.Column('chunk_embedding', Vector(), nullable=True))
+    op.create_table('vector_collections',
+    sa.Column('collection_id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('collection_name', sa.String(length=255), nullable=False),
+    sa.Column('collection_project_id', sa.Integer(), nullable=False),
+    sa.Column('embedding_size', sa.Integer(), nullable=False),
+    sa.Column('index_config', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['collection_project_id'], ['projects.project_id'], ),
+    sa.PrimaryKeyConstraint('collection_id'),
+    sa.UniqueConstraint('collection_name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('vector_collections')
+    op.drop_column('data_chunks', 'chunk_embedding')
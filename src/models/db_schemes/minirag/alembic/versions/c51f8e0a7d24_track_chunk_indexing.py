@@ -0,0 +1,31 @@
+"""Track chunk indexing state
+
+Revision ID: c51f8e0a7d24
+Revises: 9b2e4c7d1a53
+Create Date: 2026-10-18 11:03:27.904116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c51f8e0a7d24'
+down_revision: Union[str, None] = '9b2e4c7d1a53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('data_chunks', sa.Column('chunk_indexed_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('data_chunks', sa.Column('chunk_embedding_model', sa.String(length=255), nullable=True))
+    op.create_index('idx_chunk_unindexed', 'data_chunks', ['chunk_project_id'], unique=False,
+                    postgresql_where=sa.text('chunk_indexed_at IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('idx_chunk_unindexed', table_name='data_chunks', postgresql_where=sa.text('chunk_indexed_at IS NULL'))
+    op.drop_column('data_chunks', 'chunk_embedding_model')
+    op.drop_column('data_chunks', 'chunk_indexed_at')
@@ -0,0 +1,26 @@
+"""Add collection generation
+
+Revision ID: e4a1f9b3c672
+Revises: c51f8e0a7d24
+Create Date: 2026-10-18 14:21:09.518342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a1f9b3c672'
+down_revision: Union[str, None] = 'c51f8e0a7d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('vector_collections', sa.Column('collection_generation', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('vector_collections', 'collection_generation')
@@ -1,4 +1,5 @@
 from .minirag_base import SQLAlchemyBase
 from .project import Project
 from .asset import Asset
-from .data_chunk import DataChunk, RetrievedDocument
\ No newline at end of file
+from .data_chunk import DataChunk, RetrievedDocument
+from .vector_collection import VectorCollection
\ No newline at end of file
@@ -1,9 +1,11 @@
 from .minirag_base import SQLAlchemyBase
 from sqlalchemy import Column, Integer, String, Text, DateTime, func, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
+from pgvector.sqlalchemy import Vector
 import uuid
-from pydantic import BaseModel, Field
+from pydantic import BaseModel
+from typing import Optional
 
 class DataChunk(SQLAlchemyBase):
     __tablename__ = "data_chunks"
@@ -15,6 +17,11 @@ class DataChunk(SQLAlchemyBase):
     chunk_project_id = Column(Integer, ForeignKey("projects.project_id"), nullable=False)
     chunk_text = Column(Text, nullable=False)
     chunk_metadata = Column(JSONB, nullable=True)  # Additional metadata in JSON format
+    # filled by the pgvector backend only; deferred so loading chunks doesn't pull the vectors
+    chunk_embedding = deferred(Column(Vector(), nullable=True))
+    # indexing state: pushes only embed chunks that are new, edited or embedded with another model
+    chunk_indexed_at = Column(DateTime(timezone=True), nullable=True)
+    chunk_embedding_model = Column(String(255), nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
@@ -25,9 +32,12 @@ class DataChunk(SQLAlchemyBase):
     __table_args__ = (
         Index("idx_chunk_asset_id", "chunk_asset_id"),
         Index("idx_chunk_project_id", "chunk_project_id"),
+        Index("idx_chunk_unindexed", "chunk_project_id", postgresql_where=chunk_indexed_at.is_(None)),
     )
 
 class RetrievedDocument(BaseModel):
     
-    similarity_score: float = Field(..., gt=0)
+    # provider dependent: cosine / dot similarities can be zero or negative, L2 distances zero
+    similarity_score: float
     text: str
+    metadata: Optional[dict] = None
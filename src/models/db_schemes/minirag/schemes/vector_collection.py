@@ -0,0 +1,16 @@
+from .minirag_base import SQLAlchemyBase
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, func, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+
+class VectorCollection(SQLAlchemyBase):
+    __tablename__ = "vector_collections"
+
+    collection_id = Column(Integer, primary_key=True, autoincrement=True)
+    collection_name = Column(String(255), unique=True, nullable=False)
+    collection_project_id = Column(Integer, ForeignKey("projects.project_id"), nullable=False)
+    embedding_size = Column(Integer, nullable=False)
+    index_config = Column(JSONB, nullable=True)  # index type and build parameters
+    collection_generation = Column(BigInteger, nullable=False, server_default="0")  # bumped by every write
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
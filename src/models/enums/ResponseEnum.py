@@ -16,9 +16,16 @@ class ResponseSignal(Enum):
     NO_CHUNKS_FOUND = "No chunks found for the project"
     INSERT_INTO_VECTORDB_ERROR = "Error inserting into vector database"
     PROJECT_INDEXED_SUCCESSFULLY = "Project indexed successfully"
+    PROJECT_INDEX_UP_TO_DATE = "All chunks of the project are already indexed"
     PROJECT_INDEX_INFO = "Project index info"
     SEARCH_IN_VECTORDB_ERROR = "Error searching in vector database"
     ANSWER_GENERATION_ERROR = "Error generating answer"
     COLLECTION_NOT_FOUND = "Collection not found"
+    EMBEDDING_CACHE_DISABLED = "Embedding cache is disabled"
     NO_FILES_TO_DELETE = "No files available to delete in the project"
     PROJECT_DATA_RESET_SUCCESSFULLY = "Project data reset successfully"
+    DELETE_FROM_VECTORDB_ERROR = "Error deleting from vector database"
+    VECTORS_DELETED_SUCCESSFULLY = "Vectors deleted successfully"
+    NOTHING_TO_DELETE = "Either asset_id or chunk_ids must be provided"
+    ASSET_NOT_FOUND = "Asset not found in the project"
+    ASSET_FILTER_CONFLICT = "asset_id and file_name refer to different assets"
@@ -4,7 +4,7 @@ from typing import List
 import os
 import aiofiles
 from ..helpers.config import get_settings, Settings
-from ..controllers import DataController, BaseController, ProjectController, ProcessController
+from ..controllers import DataController, BaseController, ProjectController, ProcessController, NlpController
 from ..models.enums.ResponseEnum import ResponseSignal
 from ..models.enums.AssetTypeEnum import AssetTypeEnum
 import logging
@@ -18,6 +18,28 @@ from pymongo.errors import DuplicateKeyError
 logger = logging.getLogger('uvicorn.error')
 data_router = APIRouter(prefix="/api/v1/data", tags=["data"])
 
+async def delete_indexed_chunks(request: Request, project, chunk_model: ChunkModel):
+    """
+    Delete the project's chunks together with their vectors.
+
+    Pushes only index chunks that aren't indexed yet, so vectors of deleted chunks
+    would otherwise stay searchable with text that no longer exists.
+    """
+    asset_ids = await chunk_model.get_asset_ids_by_project_id(project_id=project.project_id)
+    deleted_chunks_count = await chunk_model.delete_chunks_by_project_id(project_id=project.project_id)
+
+    nlp_controller = NlpController(
+        vector_db_client=request.app.vector_db_client,
+        generation_client=request.app.generation_client,
+        embedding_client=request.app.embedding_client,
+        template_parser=request.app.template_parser,
+        answer_cache=request.app.answer_cache)
+    if await nlp_controller.is_vector_db_collection_existed(project=project):
+        for asset_id in asset_ids:
+            if not await nlp_controller.delete_from_vector_db(project=project, asset_id=asset_id):
+                logger.error(f"Error deleting the vectors of asset {asset_id} from the index of project {project.project_id}")
+    return deleted_chunks_count
+
 @data_router.post("/upload/{project_id}")
 async def upload_data(
     request: Request,
@@ -101,8 +123,8 @@ async def reset_data_by_project_id(request: Request, project_id: int = None):
     asset_model = await AssetModel.create_instance(db_client=request.app.db_client)
     chunk_model = await ChunkModel.create_instance(db_client=request.app.db_client)
     
-    # Delete all chunks associated with this project
-    deleted_chunks_count = await chunk_model.delete_chunks_by_project_id(project_id=project.project_id)
+    # Delete all chunks associated with this project, and their vectors
+    deleted_chunks_count = await delete_indexed_chunks(request=request, project=project, chunk_model=chunk_model)
     
     # Get all assets associated with this project and delete them from the database
     project_assets = await asset_model.get_all_project_assets(asset_project_id=project.project_id, asset_type=AssetTypeEnum.TYPE_FILE.value)
@@ -164,7 +186,8 @@ async def process_endpoint(request: Request, process_request: ProcessRequest, pr
 
     
     if do_reset == 1:
-        _ = await chunk_model.delete_chunks_by_project_id(project_id=project.project_id)
+        # the re-created chunks get new ids, the vectors of the old ones must go
+        _ = await delete_indexed_chunks(request=request, project=project, chunk_model=chunk_model)
     
 
     for file_id in project_file_ids:
@@ -3,6 +3,7 @@ from fastapi import FastAPI, APIRouter, Depends, UploadFile, File, status, Reque
 from fastapi.responses import JSONResponse
 from typing import List
 import os
+import asyncio
 import aiofiles
 
 from src.routes.schemes import nlp
@@ -12,7 +13,7 @@ from ..controllers import DataController, BaseController, ProjectController, Pro
 from ..models.enums.ResponseEnum import ResponseSignal
 from ..models.enums.AssetTypeEnum import AssetTypeEnum
 import logging
-from .schemes import ProcessRequest, PushRequest, SearchRequest
+from .schemes import ProcessRequest, PushRequest, SearchRequest, BatchSearchRequest, DeleteRequest
 from ..models.ProjectModel import ProjectModel
 from ..models.ChunkModel import ChunkModel
 from ..models.AssetModel import AssetModel
@@ -23,6 +24,36 @@ from ..controllers import NlpController
 logger = logging.getLogger('uvicorn.error')
 nlp_router = APIRouter(prefix="/api/v1/nlp", tags=["api_v1", "nlp"])
 
+async def build_search_filters(request: Request, project, search_request):
+    # resolve the optional asset / file / page filters into the dict the vector db expects;
+    # all of them must match, so asset_id and file_name have to name the same asset
+    asset_ids = []
+    if search_request.asset_id is not None:
+        asset_ids.append(search_request.asset_id)
+
+    if search_request.file_name:
+        asset_model = await AssetModel.create_instance(db_client=request.app.db_client)
+        asset_record = await asset_model.get_asset_record(asset_project_id=project.project_id, asset_name=search_request.file_name)
+        if asset_record is None:
+            return None, JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"message": f"{ResponseSignal.ASSET_NOT_FOUND.value}"}
+            )
+        if asset_ids and asset_ids[0] != asset_record.asset_id:
+            return None, JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"message": f"{ResponseSignal.ASSET_FILTER_CONFLICT.value}"}
+            )
+        asset_ids = [asset_record.asset_id]
+
+    filters = {}
+    if asset_ids:
+        filters["asset_ids"] = asset_ids
+    if search_request.page is not None:
+        filters["pages"] = [search_request.page]
+
+    return (filters or None), None
+
 @nlp_router.post("/index/push/{project_id}")
 async def index_project(request: Request, project_id: int, push_request: PushRequest):
 
@@ -39,25 +70,84 @@ async def index_project(request: Request, project_id: int, push_request: PushReq
         vector_db_client=request.app.vector_db_client,
         generation_client=request.app.generation_client,
         embedding_client=request.app.embedding_client,
-        template_parser=request.app.template_parser)
+        template_parser=request.app.template_parser,
+        answer_cache=request.app.answer_cache)
 
     chunk_model = await ChunkModel.create_instance(db_client=request.app.db_client)
-    chunks = await chunk_model.get_chunks_by_project_id(project_id=project.project_id)
-    if not chunks:
+    embedding_model = request.app.embedding_client.embedding_model
+    if push_request.do_reset or not await nlp_controller.is_vector_db_collection_existed(project=project):
+        # a new or reset collection holds none of the chunks, whatever they are marked as
+        _ = await chunk_model.reset_chunks_indexing(project_id=project.project_id)
+
+    index_config = {
+        "index_type": push_request.index_type,
+        "nlist": push_request.nlist,
+        "pq_m": push_request.pq_m,
+        "hnsw_m": push_request.hnsw_m,
+        "hnsw_ef_construction": push_request.hnsw_ef_construction,
+        "quantization": push_request.quantization,
+        "num_shards": push_request.num_shards,
+        "on_disk": push_request.on_disk,
+        "on_disk_payload": push_request.on_disk_payload,
+    }
+    # only chunks that are not in the collection yet are streamed from the db and embedded
+    chunk_batches = chunk_model.iterate_unindexed_chunks_by_project_id(project_id=project.project_id, embedding_model=embedding_model)
+
+    async def mark_indexed(chunk_ids: List[int]):
+        await chunk_model.mark_chunks_indexed(chunk_ids=chunk_ids, embedding_model=embedding_model)
+
+    indexed_count = await nlp_controller.index_into_vector_db(project=project, chunk_batches=chunk_batches, do_reset=push_request.do_reset,
+                                                              index_config=index_config, on_batch_indexed=mark_indexed)
+    if indexed_count is False:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
-            content={"message": f"{ResponseSignal.NO_CHUNKS_FOUND.value}"}
+            content={"message": f"{ResponseSignal.INSERT_INTO_VECTORDB_ERROR.value}"}
+        )
+
+    if indexed_count == 0:
+        if await chunk_model.get_chunks_count_by_project_id(project_id=project.project_id) == 0:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"message": f"{ResponseSignal.NO_CHUNKS_FOUND.value}"}
+            )
+        return JSONResponse(
+            content={"message": f"{ResponseSignal.PROJECT_INDEX_UP_TO_DATE.value}", "indexed_items": "0"}
         )
     
-    is_inserted = nlp_controller.index_into_vector_db(project=project, chunks=chunks, do_reset=push_request.do_reset)
-    if not is_inserted:
+    return JSONResponse(
+        content={"message": f"{ResponseSignal.PROJECT_INDEXED_SUCCESSFULLY.value}", "indexed_items": f"{indexed_count}"}
+    )
+
+@nlp_router.post("/index/delete/{project_id}")
+async def delete_from_index(request: Request, project_id: int, delete_request: DeleteRequest):
+    """
+    Remove the vectors of one asset and/or specific chunks from the project's index.
+    """
+    if delete_request.asset_id is None and not delete_request.chunk_ids:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
-            content={"message": f"{ResponseSignal.INSERT_INTO_VECTORDB_ERROR.value}", "inserted_items": f"{len(chunks)}"}
+            content={"message": f"{ResponseSignal.NOTHING_TO_DELETE.value}"}
         )
-    
+
+    project_model = await ProjectModel.create_instance(db_client=request.app.db_client)
+    project = await project_model.get_project_or_create_one(project_id=project_id)
+
+    nlp_controller = NlpController(
+    vector_db_client=request.app.vector_db_client,
+    generation_client=request.app.generation_client,
+    embedding_client=request.app.embedding_client,
+    template_parser=request.app.template_parser,
+    answer_cache=request.app.answer_cache)
+
+    is_deleted = await nlp_controller.delete_from_vector_db(project=project, asset_id=delete_request.asset_id, chunk_ids=delete_request.chunk_ids)
+    if not is_deleted:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"message": f"{ResponseSignal.DELETE_FROM_VECTORDB_ERROR.value}"}
+        )
+
     return JSONResponse(
-        content={"message": f"{ResponseSignal.PROJECT_INDEXED_SUCCESSFULLY.value}", "indexed_items": f"{len(chunks)}"}
+        content={"message": f"{ResponseSignal.VECTORS_DELETED_SUCCESSFULLY.value}"}
     )
 
 @nlp_router.get("/index/info/{project_id}")
@@ -77,7 +167,7 @@ async def get_project_index_info(request: Request, project_id: int):
     embedding_client=request.app.embedding_client,
     template_parser=request.app.template_parser)
 
-    collection_info = nlp_controller.get_vector_db_collection_info(project=project)
+    collection_info = await nlp_controller.get_vector_db_collection_info(project=project)
 
     if not collection_info:
         return JSONResponse(
@@ -93,6 +183,22 @@ async def get_project_index_info(request: Request, project_id: int):
     )
 
 
+@nlp_router.get("/embeddings/cache/info")
+async def get_embedding_cache_info(request: Request):
+    embedding_cache = request.app.llm_factory.embedding_cache
+    query_embedding_cache = request.app.llm_factory.query_embedding_cache
+    if embedding_cache is None and query_embedding_cache is None:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"message": f"{ResponseSignal.EMBEDDING_CACHE_DISABLED.value}"}
+        )
+    cache_info = await asyncio.to_thread(embedding_cache.stats) if embedding_cache is not None else None
+    query_cache_info = query_embedding_cache.stats() if query_embedding_cache is not None else None
+    return JSONResponse(
+        content={"cache_info": cache_info, "query_cache_info": query_cache_info}
+    )
+
+
 @nlp_router.post("/index/search/{project_id}")
 async def search_index(request: Request, project_id: int, search_request: SearchRequest):
     project_model = await ProjectModel.create_instance(db_client=request.app.db_client)
@@ -104,7 +210,12 @@ async def search_index(request: Request, project_id: int, search_request: Search
     embedding_client=request.app.embedding_client,
     template_parser=request.app.template_parser)
 
-    results = nlp_controller.search_from_vector_db(project=project, query=search_request.query, limit=search_request.top_k)
+    filters, error_response = await build_search_filters(request=request, project=project, search_request=search_request)
+    if error_response:
+        return error_response
+
+    search_params = {"nprobe": search_request.nprobe, "ef_search": search_request.ef_search, "rescore": search_request.rescore}
+    results = await nlp_controller.search_from_vector_db(project=project, query=search_request.query, limit=search_request.top_k, search_params=search_params, filters=filters)
     if not results:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -116,6 +227,34 @@ async def search_index(request: Request, project_id: int, search_request: Search
         content={"results" : results_as_dicts}
     )
 
+@nlp_router.post("/index/search/batch/{project_id}")
+async def search_index_batch(request: Request, project_id: int, search_request: BatchSearchRequest):
+    project_model = await ProjectModel.create_instance(db_client=request.app.db_client)
+    project = await project_model.get_project_or_create_one(project_id=project_id)
+
+    nlp_controller = NlpController(
+    vector_db_client=request.app.vector_db_client,
+    generation_client=request.app.generation_client,
+    embedding_client=request.app.embedding_client,
+    template_parser=request.app.template_parser)
+
+    filters, error_response = await build_search_filters(request=request, project=project, search_request=search_request)
+    if error_response:
+        return error_response
+
+    search_params = {"nprobe": search_request.nprobe, "ef_search": search_request.ef_search, "rescore": search_request.rescore}
+    results = await nlp_controller.search_batch_from_vector_db(project=project, queries=search_request.queries, limit=search_request.top_k, search_params=search_params, filters=filters)
+    if not results:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={"message": f"{ResponseSignal.SEARCH_IN_VECTORDB_ERROR.value}"}
+        )
+    results_as_dicts = [[result.model_dump() for result in query_results] for query_results in results]
+
+    return JSONResponse(
+        content={"results" : results_as_dicts}
+    )
+
 @nlp_router.post("/index/answer/{project_id}")
 async def answer_rag(request: Request, project_id: int, search_request: SearchRequest):
     project_model = await ProjectModel.create_instance(db_client=request.app.db_client)
@@ -125,9 +264,15 @@ async def answer_rag(request: Request, project_id: int, search_request: SearchRe
     vector_db_client=request.app.vector_db_client,
     generation_client=request.app.generation_client,
     embedding_client=request.app.embedding_client,
-    template_parser=request.app.template_parser)
+    template_parser=request.app.template_parser,
+    answer_cache=request.app.answer_cache)
+
+    filters, error_response = await build_search_filters(request=request, project=project, search_request=search_request)
+    if error_response:
+        return error_response
 
-    answer, full_prompt, chat_history = nlp_controller.answer_rag_question(project=project, question=search_request.query, limit=search_request.top_k)
+    search_params = {"nprobe": search_request.nprobe, "ef_search": search_request.ef_search, "rescore": search_request.rescore}
+    answer, full_prompt, chat_history, cache_hit = await nlp_controller.answer_rag_question(project=project, question=search_request.query, limit=search_request.top_k, search_params=search_params, filters=filters)
     if not answer:
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -135,5 +280,5 @@ async def answer_rag(request: Request, project_id: int, search_request: SearchRe
         )
 
     return JSONResponse(
-        content={"answer" : answer, "full_prompt": full_prompt, "chat_history": chat_history}
+        content={"answer" : answer, "full_prompt": full_prompt, "chat_history": chat_history, "cache_hit": cache_hit}
     )
\ No newline at end of file
@@ -1,3 +1,5 @@
 from .data import ProcessRequest
 from .nlp import PushRequest
-from .nlp import SearchRequest
\ No newline at end of file
+from .nlp import SearchRequest
+from .nlp import BatchSearchRequest
+from .nlp import DeleteRequest
\ No newline at end of file
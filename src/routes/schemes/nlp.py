@@ -1,11 +1,52 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List
 
 class PushRequest(BaseModel):
 
     do_reset : Optional[int] = 0
+    index_type : Optional[str] = None
+    nlist : Optional[int] = None
+    pq_m : Optional[int] = None
+    hnsw_m : Optional[int] = None
+    hnsw_ef_construction : Optional[int] = None
+    quantization : Optional[str] = None
+    num_shards : Optional[int] = None
+    on_disk : Optional[bool] = None
+    on_disk_payload : Optional[bool] = None
+
+class DeleteRequest(BaseModel):
+
+    asset_id : Optional[int] = None
+    chunk_ids : Optional[List[int]] = None
 
 class SearchRequest(BaseModel):
     
     query: str
-    top_k: Optional[int] = 5
\ No newline at end of file
+    top_k: Optional[int] = 5
+    nprobe: Optional[int] = None
+    ef_search: Optional[int] = None
+    rescore: Optional[bool] = None
+    # filters are combined with AND
+    asset_id: Optional[int] = Field(default=None, description="Only search chunks of this asset")
+    file_name: Optional[str] = Field(
+        default=None,
+        description="Only search chunks of the asset with this name; when asset_id is also set, both must "
+                    "name the same asset, otherwise the request is rejected with a 400",
+    )
+    page: Optional[int] = Field(default=None, description="Only search chunks of this page")
+
+class BatchSearchRequest(BaseModel):
+
+    queries: List[str]
+    top_k: Optional[int] = 5
+    nprobe: Optional[int] = None
+    ef_search: Optional[int] = None
+    rescore: Optional[bool] = None
+    # filters are combined with AND
+    asset_id: Optional[int] = Field(default=None, description="Only search chunks of this asset")
+    file_name: Optional[str] = Field(
+        default=None,
+        description="Only search chunks of the asset with this name; when asset_id is also set, both must "
+                    "name the same asset, otherwise the request is rejected with a 400",
+    )
+    page: Optional[int] = Field(default=None, description="Only search chunks of this page")
\ No newline at end of file
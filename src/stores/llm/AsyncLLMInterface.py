@@ -0,0 +1,25 @@
+from abc import ABC, abstractmethod
+
+
+
+class AsyncLLMInterface(ABC):
+
+    @abstractmethod
+    def set_generation_model(self, model_id: str):
+        pass
+    
+    @abstractmethod
+    def set_embedding_model(self, model_id: str, embedding_size: int = None):
+        pass
+    
+    @abstractmethod
+    async def generate_text(self, prompt: str, chat_history : list = [], max_output_tokens: int = None, temp: float = None):
+        pass
+
+    @abstractmethod
+    async def embed_text(self, text: str, document_type: str):
+        pass
+    
+    @abstractmethod
+    def construct_prompt(self, prompt: str, role: str):
+        pass
@@ -0,0 +1,56 @@
+from typing import List, Optional
+
+
+class EmbeddingBatcher:
+    """
+    Packs texts into embedding requests by item count and estimated token count.
+
+    Items are added in order and come back in contiguous batches, each holding as many
+    items as fit in both limits. A single text over the token budget is sent on its own
+    and left to the provider to truncate.
+    """
+
+    # conservative, English averages about 4 characters per token, Arabic text fewer
+    CHARS_PER_TOKEN = 3
+
+    def __init__(self, max_items: int, max_tokens: int = None):
+        self.max_items = max_items
+        # None: the provider has no per-request token limit, only the item count applies
+        self.max_tokens = max_tokens
+        self.items = []
+        self.tokens = 0
+
+    @classmethod
+    def estimate_tokens(cls, text: str) -> int:
+        return len(text) // cls.CHARS_PER_TOKEN + 1
+
+    def add(self, item, text: str) -> Optional[list]:
+        # returns the batch this item didn't fit in, if any
+        tokens = self.estimate_tokens(text)
+        full_batch = None
+        if self.items and (
+            len(self.items) >= self.max_items
+            or (self.max_tokens is not None and self.tokens + tokens > self.max_tokens)
+        ):
+            full_batch = self.flush()
+        self.items.append(item)
+        self.tokens += tokens
+        return full_batch
+
+    def flush(self) -> Optional[list]:
+        if not self.items:
+            return None
+        batch = self.items
+        self.items, self.tokens = [], 0
+        return batch
+
+    def split(self, texts: List[str]) -> List[List[str]]:
+        batches = []
+        for text in texts:
+            full_batch = self.add(text, text)
+            if full_batch is not None:
+                batches.append(full_batch)
+        last_batch = self.flush()
+        if last_batch is not None:
+            batches.append(last_batch)
+        return batches
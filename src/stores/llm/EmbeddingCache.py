@@ -0,0 +1,139 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+from typing import List, Optional
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of embeddings keyed by (model, dimension, document type, sha256 of the text).
+
+    Backed by one SQLite file shared by every project and uvicorn worker, so re-indexing
+    a project or pushing the same boilerplate text elsewhere is served locally instead of
+    calling the embedding API again. Least recently used rows are evicted once the file
+    outgrows its size budget.
+    """
+
+    # SQLite caps the number of bound parameters per statement
+    LOOKUP_BATCH_SIZE = 500
+
+    def __init__(self, db_path: str, max_size_mb: int = 1024):
+        self.db_path = db_path
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "id INTEGER PRIMARY KEY, "
+            "model TEXT NOT NULL, "
+            "dimension INTEGER NOT NULL, "
+            "document_type TEXT NOT NULL, "
+            "text_hash BLOB NOT NULL, "
+            "vector BLOB NOT NULL, "
+            "last_used_at REAL NOT NULL, "
+            "UNIQUE (model, dimension, document_type, text_hash))"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used_at ON embeddings (last_used_at)")
+        self.connection.commit()
+
+    @staticmethod
+    def hash_text(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def get_many(self, model: str, dimension: int, document_type: str, texts: List[str]) -> List[Optional[list]]:
+        hashes = [self.hash_text(text) for text in texts]
+        found = {}
+        with self.lock:
+            for i in range(0, len(hashes), self.LOOKUP_BATCH_SIZE):
+                batch = list(set(hashes[i:i + self.LOOKUP_BATCH_SIZE]))
+                placeholders = ",".join("?" * len(batch))
+                rows = self.connection.execute(
+                    f"SELECT id, text_hash, vector FROM embeddings WHERE model = ? AND dimension = ? "
+                    f"AND document_type = ? AND text_hash IN ({placeholders})",
+                    [model, dimension or 0, document_type, *batch]
+                ).fetchall()
+                for row_id, text_hash, vector in rows:
+                    found[text_hash] = (row_id, vector)
+            if found:
+                # hits count as uses for the LRU eviction
+                with self.connection:
+                    now = time.time()
+                    self.connection.executemany(
+                        "UPDATE embeddings SET last_used_at = ? WHERE id = ?",
+                        [(now, row_id) for row_id, _ in found.values()]
+                    )
+
+        results = []
+        for text_hash in hashes:
+            if text_hash in found:
+                results.append(np.frombuffer(found[text_hash][1], dtype='float32').tolist())
+            else:
+                results.append(None)
+        hits = sum(1 for result in results if result is not None)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, dimension: int, document_type: str, texts: List[str], vectors: List[list]):
+        now = time.time()
+        rows = [
+            (model, dimension or 0, document_type, self.hash_text(text), np.asarray(vector, dtype='float32').tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self.lock:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, dimension, document_type, text_hash, vector, last_used_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+            self.evict()
+
+    def size_bytes(self) -> int:
+        # pages in use, pages freed by evictions are reused before the file grows again
+        page_count = self.connection.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = self.connection.execute("PRAGMA freelist_count").fetchone()[0]
+        page_size = self.connection.execute("PRAGMA page_size").fetchone()[0]
+        return (page_count - freelist_count) * page_size
+
+    def evict(self) -> int:
+        # callers hold self.lock
+        size_bytes = self.size_bytes()
+        if size_bytes <= self.max_size_bytes:
+            return 0
+        count = self.connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count == 0:
+            return 0
+        # rows of one model are the same size, free down to 90% of the budget in one statement
+        row_bytes = size_bytes / count
+        num_evicted = min(count, int((size_bytes - 0.9 * self.max_size_bytes) / row_bytes) + 1)
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM embeddings WHERE id IN (SELECT id FROM embeddings ORDER BY last_used_at LIMIT ?)",
+                (num_evicted,)
+            )
+        return num_evicted
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            size_bytes = self.size_bytes()
+        lookups = self.hits + self.misses
+        # hits and misses are counted per process since startup
+        return {
+            "entries": entries,
+            "size_bytes": size_bytes,
+            "max_size_bytes": self.max_size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
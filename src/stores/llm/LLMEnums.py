@@ -11,6 +11,7 @@ class LLMEnums(Enum):
     HUGGINGFACE = "HUGGINGFACE"
     CUSTOM = "CUSTOM"
     VERTEX_AI = "VERTEX_AI"
+    LOCAL = "LOCAL"
     LLM_TYPE_CHAT = "chat"
     LLM_TYPE_COMPLETION = "completion"
     LLM_TYPE_EMBEDDING = "embedding"
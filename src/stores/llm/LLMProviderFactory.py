@@ -1,10 +1,20 @@
 from .LLMEnums import LLMEnums
-from .providers import OpenAIProvider, CohereProvider
+from .providers import OpenAIProvider, CohereProvider, AsyncOpenAIProvider, AsyncCohereProvider, CachedEmbeddingProvider
+from .providers import LocalProvider, AsyncLocalProvider
+from .EmbeddingCache import EmbeddingCache
+from .QueryEmbeddingCache import QueryEmbeddingCache
+from ...controllers.BaseController import BaseController
+import httpx
+import os
 
 
 class LLMProviderFactory:
     def __init__(self, config: dict):
         self.config = config
+        # one connection pool for every async provider created here, kept alive between requests
+        self.http_client = None
+        self.embedding_cache = None
+        self.query_embedding_cache = None
 
     def create(self, provider_name: str):
         if provider_name == LLMEnums.OPENAI.value:
@@ -15,6 +25,8 @@ class LLMProviderFactory:
                 default_input_max_tokens=self.config.INPUT_DEFAULT_MAX_TOKENS,
                 default_output_max_tokens=self.config.GENERATION_DEFAULT_MAX_TOKENS,
                 default_temp=self.config.GENERATION_DEFAULT_TEMPERATURE,
+                embedding_max_batch_items=self.config.EMBEDDING_BATCH_MAX_ITEMS,
+                embedding_max_batch_tokens=self.config.EMBEDDING_BATCH_MAX_TOKENS,
             )
 
         if provider_name == LLMEnums.COHERE.value:
@@ -23,4 +35,79 @@ class LLMProviderFactory:
                 default_input_max_tokens=self.config.INPUT_DEFAULT_MAX_TOKENS,
                 default_output_max_tokens=self.config.GENERATION_DEFAULT_MAX_TOKENS,
                 default_temp=self.config.GENERATION_DEFAULT_TEMPERATURE,
+                embedding_max_batch_items=self.config.EMBEDDING_BATCH_MAX_ITEMS,
+                embedding_max_batch_tokens=self.config.EMBEDDING_BATCH_MAX_TOKENS,
             )
+
+        if provider_name == LLMEnums.LOCAL.value:
+            return LocalProvider(
+                default_input_max_tokens=self.config.INPUT_DEFAULT_MAX_TOKENS,
+                embedding_max_batch_items=self.config.EMBEDDING_BATCH_MAX_ITEMS,
+                num_threads=self.config.LOCAL_EMBEDDING_THREADS,
+            )
+
+    def get_http_client(self) -> httpx.AsyncClient:
+        if self.http_client is None:
+            max_connections = self.config.LLM_MAX_CONNECTIONS or 100
+            self.http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            )
+        return self.http_client
+
+    def create_async(self, provider_name: str):
+        if provider_name == LLMEnums.OPENAI.value:
+            return AsyncOpenAIProvider(
+                api_key=self.config.OPENAI_API_KEY,
+                base_url=self.config.OPENAI_BASE_URL,
+                default_input_max_tokens=self.config.INPUT_DEFAULT_MAX_TOKENS,
+                default_output_max_tokens=self.config.GENERATION_DEFAULT_MAX_TOKENS,
+                default_temp=self.config.GENERATION_DEFAULT_TEMPERATURE,
+                embedding_max_batch_items=self.config.EMBEDDING_BATCH_MAX_ITEMS,
+                embedding_max_batch_tokens=self.config.EMBEDDING_BATCH_MAX_TOKENS,
+                http_client=self.get_http_client(),
+            )
+
+        if provider_name == LLMEnums.COHERE.value:
+            return AsyncCohereProvider(
+                api_key=self.config.COHERE_API_KEY,
+                default_input_max_tokens=self.config.INPUT_DEFAULT_MAX_TOKENS,
+                default_output_max_tokens=self.config.GENERATION_DEFAULT_MAX_TOKENS,
+                default_temp=self.config.GENERATION_DEFAULT_TEMPERATURE,
+                embedding_max_batch_items=self.config.EMBEDDING_BATCH_MAX_ITEMS,
+                embedding_max_batch_tokens=self.config.EMBEDDING_BATCH_MAX_TOKENS,
+                http_client=self.get_http_client(),
+            )
+
+        if provider_name == LLMEnums.LOCAL.value:
+            return AsyncLocalProvider(
+                default_input_max_tokens=self.config.INPUT_DEFAULT_MAX_TOKENS,
+                embedding_max_batch_items=self.config.EMBEDDING_BATCH_MAX_ITEMS,
+                num_threads=self.config.LOCAL_EMBEDDING_THREADS,
+            )
+
+    def create_cached(self, llm_client):
+        # embeddings are kept on disk when a cache path is configured
+        if self.config.EMBEDDING_CACHE_PATH and self.embedding_cache is None:
+            cache_dir = BaseController().get_database_path(self.config.EMBEDDING_CACHE_PATH)
+            self.embedding_cache = EmbeddingCache(
+                db_path=os.path.join(cache_dir, "embeddings.db"),
+                max_size_mb=self.config.EMBEDDING_CACHE_MAX_SIZE_MB or 1024
+            )
+        # and query embeddings in memory as well when a cache size is configured
+        if self.config.QUERY_EMBEDDING_CACHE_SIZE and self.query_embedding_cache is None:
+            self.query_embedding_cache = QueryEmbeddingCache(
+                max_entries=self.config.QUERY_EMBEDDING_CACHE_SIZE,
+                ttl_seconds=self.config.QUERY_EMBEDDING_CACHE_TTL_SECONDS or 3600
+            )
+        if self.embedding_cache is None and self.query_embedding_cache is None:
+            return llm_client
+        return CachedEmbeddingProvider(llm_client=llm_client, embedding_cache=self.embedding_cache,
+                                       query_cache=self.query_embedding_cache)
+
+    async def close(self):
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
+            self.embedding_cache = None
+        if self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
@@ -0,0 +1,57 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class QueryEmbeddingCache:
+    """
+    In-process LRU cache of query embeddings, keyed by (model, dimension, normalized query text).
+
+    Repeated searches and questions skip the embedding round trip entirely. Entries
+    expire after a time to live so a changed embedding deployment is picked up, and
+    the least recently used ones are dropped beyond max_entries.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # key -> (expires_at, vector), oldest use first
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        # queries differing only in case or whitespace share one entry
+        return " ".join(text.split()).casefold()
+
+    def get(self, model: str, dimension: int, text: str) -> Optional[list]:
+        key = (model, dimension, self.normalize(text))
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self.entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, model: str, dimension: int, text: str, vector: list):
+        key = (model, dimension, self.normalize(text))
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, vector)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,106 @@
+import json
+import time
+import numpy as np
+from typing import Dict, Optional
+
+
+class AnswerBucket:
+    """Cached answers of one project for one set of search options, with their unit query vectors."""
+
+    def __init__(self, dimension: int):
+        self.vectors = np.empty((0, dimension), dtype='float32')
+        self.expires_at = np.empty(0, dtype='float64')
+        self.last_used_at = np.empty(0, dtype='float64')
+        self.answers = []
+
+    def remove(self, keep: np.ndarray):
+        self.vectors = self.vectors[keep]
+        self.expires_at = self.expires_at[keep]
+        self.last_used_at = self.last_used_at[keep]
+        self.answers = [answer for answer, kept in zip(self.answers, keep) if kept]
+
+
+class SemanticAnswerCache:
+    """
+    Per-project cache of generated RAG answers, looked up by query embedding similarity.
+
+    A question whose embedding is within similarity_threshold (cosine) of an earlier
+    question of the same project, asked with the same search options, gets the earlier
+    answer without retrieval or generation. Anything changing a project's collection
+    invalidates its answers: writes made by this worker directly, writes made by other
+    workers (which each keep their own cache) once the collection generation passed to
+    get differs. The time to live bounds staleness where no generation can be told.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.95, max_entries: int = 1000, ttl_seconds: int = 3600):
+        self.similarity_threshold = similarity_threshold
+        # per project and set of search options
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # project_id -> options key -> AnswerBucket
+        self.projects: Dict[int, Dict[str, AnswerBucket]] = {}
+        # bumped on invalidation, answers generated against an older version are not stored
+        self.versions: Dict[int, int] = {}
+        # project_id -> collection generation the cached answers were generated from
+        self.generations: Dict[int, object] = {}
+
+    @staticmethod
+    def options_key(limit: int, search_params: dict = None, filters: dict = None) -> str:
+        # answers depend on what was retrieved, not only on the question
+        return json.dumps([limit, search_params, filters], sort_keys=True, default=str)
+
+    @staticmethod
+    def normalize(vector: list) -> np.ndarray:
+        vector = np.asarray(vector, dtype='float32')
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def version(self, project_id: int) -> int:
+        return self.versions.get(project_id, 0)
+
+    def get(self, project_id: int, options_key: str, query_vector: list, generation=None) -> Optional[tuple]:
+        if generation is not None and self.generations.get(project_id, generation) != generation:
+            # the collection was changed, possibly by another worker
+            self.invalidate(project_id)
+        bucket = self.projects.get(project_id, {}).get(options_key)
+        if bucket is not None:
+            now = time.time()
+            expired = bucket.expires_at < now
+            if expired.any():
+                bucket.remove(~expired)
+            if bucket.answers:
+                similarities = bucket.vectors @ self.normalize(query_vector)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.similarity_threshold:
+                    bucket.last_used_at[best] = now
+                    return bucket.answers[best]
+        return None
+
+    def put(self, project_id: int, options_key: str, query_vector: list, answer: tuple, version: int, generation=None):
+        if version != self.version(project_id):
+            # the collection changed while this answer was being generated
+            return
+        if generation is not None:
+            if self.generations.get(project_id, generation) != generation:
+                self.invalidate(project_id)
+            self.generations[project_id] = generation
+        vector = self.normalize(query_vector)
+        bucket = self.projects.setdefault(project_id, {}).get(options_key)
+        if bucket is None or bucket.vectors.shape[1] != len(vector):
+            bucket = self.projects[project_id][options_key] = AnswerBucket(dimension=len(vector))
+        if len(bucket.answers) >= self.max_entries:
+            # evict the least recently used answer
+            keep = np.ones(len(bucket.answers), dtype=bool)
+            keep[int(np.argmin(bucket.last_used_at))] = False
+            bucket.remove(keep)
+        now = time.time()
+        bucket.vectors = np.vstack([bucket.vectors, vector[None, :]])
+        bucket.expires_at = np.append(bucket.expires_at, now + self.ttl_seconds)
+        bucket.last_used_at = np.append(bucket.last_used_at, now)
+        bucket.answers.append(answer)
+
+    def invalidate(self, project_id: int):
+        self.projects.pop(project_id, None)
+        self.generations.pop(project_id, None)
+        self.versions[project_id] = self.version(project_id) + 1
+
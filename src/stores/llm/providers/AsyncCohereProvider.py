@@ -0,0 +1,61 @@
+from ..AsyncLLMInterface import AsyncLLMInterface
+from .CohereProvider import CohereProvider
+import cohere
+import httpx
+from typing import Union, List
+
+
+class AsyncCohereProvider(CohereProvider, AsyncLLMInterface):
+    """CohereProvider whose requests are awaited on the event loop; only the client calls differ."""
+
+    def __init__(
+        self,
+        api_key: str,
+        default_input_max_tokens: int = 1000,
+        default_output_max_tokens: int = 1000,
+        default_temp: float = 0.1,
+        embedding_max_batch_items: int = None,
+        embedding_max_batch_tokens: int = None,
+        http_client: httpx.AsyncClient = None,
+    ):
+        self.http_client = http_client
+        super().__init__(
+            api_key=api_key,
+            default_input_max_tokens=default_input_max_tokens,
+            default_output_max_tokens=default_output_max_tokens,
+            default_temp=default_temp,
+            embedding_max_batch_items=embedding_max_batch_items,
+            embedding_max_batch_tokens=embedding_max_batch_tokens,
+        )
+
+    def create_client(self):
+        # connections come from the pool shared by all providers
+        return cohere.AsyncClientV2(api_key=self.api_key, httpx_client=self.http_client)
+
+    async def generate_text(
+        self,
+        prompt: str,
+        chat_history: list = [],
+        max_output_tokens: int = None,
+        temp: float = None,
+    ):
+        if not self.is_generation_ready():
+            return None
+
+        request = self.build_chat_request(prompt, chat_history, max_output_tokens, temp)
+        response = await self.client.chat(**request)
+        return self.parse_chat_response(response, chat_history)
+
+    async def embed_text(self, text: Union[str, List[str]], document_type: str):
+        if not self.is_embedding_ready():
+            return None
+
+        embeddings = []
+        for batch in self.get_embedding_batches(text):
+            response = await self.client.embed(**self.build_embedding_request(batch, document_type))
+            vectors = self.parse_embedding_response(response, batch)
+            if vectors is None:
+                return None
+            embeddings.extend(vectors)
+
+        return embeddings
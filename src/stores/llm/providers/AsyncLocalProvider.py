@@ -0,0 +1,21 @@
+from ..AsyncLLMInterface import AsyncLLMInterface
+from .LocalProvider import LocalProvider
+from typing import Union, List
+import asyncio
+
+
+class AsyncLocalProvider(LocalProvider, AsyncLLMInterface):
+    """LocalProvider for the async app, encoding runs in a worker thread off the event loop."""
+
+    async def generate_text(
+        self,
+        prompt: str,
+        chat_history: list = [],
+        max_output_tokens: int = None,
+        temp: float = None,
+    ):
+        return super().generate_text(prompt=prompt, chat_history=chat_history,
+                                     max_output_tokens=max_output_tokens, temp=temp)
+
+    async def embed_text(self, text: Union[str, List[str]], document_type: str):
+        return await asyncio.to_thread(super().embed_text, text, document_type)
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from typing import Union, List
+from ..AsyncLLMInterface import AsyncLLMInterface
+from ..EmbeddingCache import EmbeddingCache
+from ..QueryEmbeddingCache import QueryEmbeddingCache
+from ..LLMEnums import DocumentTypeEnums
+
+
+class CachedEmbeddingProvider(AsyncLLMInterface):
+    """
+    Serves embeddings from the in-memory query cache and the on-disk EmbeddingCache (either
+    may be None) and only sends the misses to the wrapped provider.
+    """
+
+    def __init__(self, llm_client: AsyncLLMInterface, embedding_cache: EmbeddingCache = None,
+                 query_cache: QueryEmbeddingCache = None):
+        self.client = llm_client
+        self.embedding_cache = embedding_cache
+        self.query_cache = query_cache
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def enums(self):
+        return self.client.enums
+
+    @property
+    def embedding_model(self):
+        return self.client.embedding_model
+
+    @property
+    def embedding_size(self):
+        return self.client.embedding_size
+
+    @property
+    def embedding_max_batch_items(self):
+        return self.client.embedding_max_batch_items
+
+    @property
+    def embedding_max_batch_tokens(self):
+        return self.client.embedding_max_batch_tokens
+
+    def set_generation_model(self, model_id: str):
+        self.client.set_generation_model(model_id)
+
+    def set_embedding_model(self, model_id: str, embedding_size: int = None):
+        self.client.set_embedding_model(model_id, embedding_size)
+
+    async def generate_text(self, prompt: str, chat_history: list = [], max_output_tokens: int = None, temp: float = None):
+        return await self.client.generate_text(prompt=prompt, chat_history=chat_history,
+                                               max_output_tokens=max_output_tokens, temp=temp)
+
+    async def embed_text(self, text: Union[str, List[str]], document_type: str):
+        if isinstance(text, str):
+            text = [text]
+        if self.query_cache is None or document_type != DocumentTypeEnums.QUERY.value:
+            return await self.embed_with_disk_cache(text, document_type)
+
+        # repeated queries are answered from memory, without a disk lookup or a round trip
+        vectors = [self.query_cache.get(self.embedding_model, self.embedding_size, t) for t in text]
+        missing_texts = [t for t, vector in zip(text, vectors) if vector is None]
+        if missing_texts:
+            missing_vectors = await self.embed_with_disk_cache(missing_texts, document_type)
+            if not missing_vectors or len(missing_vectors) != len(missing_texts):
+                self.logger.error(f"Failed to embed {len(missing_texts)} queries missing from the query cache")
+                return None
+            for t, vector in zip(missing_texts, missing_vectors):
+                self.query_cache.put(self.embedding_model, self.embedding_size, t, vector)
+            missing_vectors = iter(missing_vectors)
+            vectors = [vector if vector is not None else next(missing_vectors) for vector in vectors]
+        return vectors
+
+    async def embed_with_disk_cache(self, text: List[str], document_type: str):
+        if self.embedding_cache is None:
+            return await self.client.embed_text(text=text, document_type=document_type)
+        cache_key = (self.embedding_model, self.embedding_size, document_type)
+
+        # SQLite calls block, keep them off the event loop
+        vectors = await asyncio.to_thread(self.embedding_cache.get_many, *cache_key, text)
+
+        # identical texts within one call are embedded once
+        missing_texts = list(dict.fromkeys(t for t, vector in zip(text, vectors) if vector is None))
+        if missing_texts:
+            missing_vectors = await self.client.embed_text(text=missing_texts, document_type=document_type)
+            if not missing_vectors or len(missing_vectors) != len(missing_texts):
+                self.logger.error(f"Failed to embed {len(missing_texts)} texts missing from the embedding cache")
+                return None
+            await asyncio.to_thread(self.embedding_cache.put_many, *cache_key, missing_texts, missing_vectors)
+            embedded = dict(zip(missing_texts, missing_vectors))
+            vectors = [vector if vector is not None else embedded[t] for t, vector in zip(text, vectors)]
+
+        return vectors
+
+    def construct_prompt(self, prompt: str, role: str):
+        return self.client.construct_prompt(prompt, role)
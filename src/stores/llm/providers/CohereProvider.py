@@ -4,29 +4,43 @@ from ..LLMInterface import LLMInterface
 import cohere
 import os
 import logging
+from ..EmbeddingBatcher import EmbeddingBatcher
 from typing import Union, List
 
 
 class CohereProvider(LLMInterface):
 
+    # texts per embed request accepted by the API; each text is truncated server-side,
+    # so there is no request token budget to respect
+    MAX_EMBEDDING_INPUTS = 96
+    MAX_EMBEDDING_TOKENS = None
+
     def __init__(
         self,
         api_key: str,
         default_input_max_tokens: int = 1000,
         default_output_max_tokens: int = 1000,
         default_temp: float = 0.1,
+        embedding_max_batch_items: int = None,
+        embedding_max_batch_tokens: int = None,
     ):
         self.api_key = api_key
         self.default_input_max_tokens = default_input_max_tokens
         self.default_output_max_tokens = default_output_max_tokens
         self.default_temp = default_temp
+        # settings can lower the API limits
+        self.embedding_max_batch_items = embedding_max_batch_items or self.MAX_EMBEDDING_INPUTS
+        self.embedding_max_batch_tokens = embedding_max_batch_tokens or self.MAX_EMBEDDING_TOKENS
         self.generation_model = None
         self.embedding_model = None
         self.embedding_size = None
-        self.client = cohere.ClientV2(api_key=self.api_key)
+        self.client = self.create_client()
         self.enums = CohereEnums
         self.logger = logging.getLogger(__name__)
 
+    def create_client(self):
+        return cohere.ClientV2(api_key=self.api_key)
+
     def process_text(self, text: str):
         return text[: self.default_input_max_tokens].strip()
 
@@ -44,31 +58,71 @@ class CohereProvider(LLMInterface):
         max_output_tokens: int = None,
         temp: float = None,
     ):
+        if not self.is_generation_ready():
+            return None
+
+        request = self.build_chat_request(prompt, chat_history, max_output_tokens, temp)
+        response = self.client.chat(**request)
+        return self.parse_chat_response(response, chat_history)
+
+    def embed_text(self, text: Union[str, List[str]], document_type: str):
+        if not self.is_embedding_ready():
+            return None
+
+        embeddings = []
+        # requests over the API's limits are split, results keep the input order
+        for batch in self.get_embedding_batches(text):
+            response = self.client.embed(**self.build_embedding_request(batch, document_type))
+            vectors = self.parse_embedding_response(response, batch)
+            if vectors is None:
+                return None
+            embeddings.extend(vectors)
+
+        return embeddings
+
+    # request building and response parsing, shared with AsyncCohereProvider
+
+    def is_generation_ready(self) -> bool:
         if self.client is None:
             self.logger.error(
                 "Cohere client is not initialized. Please set the API key."
             )
-            return None
+            return False
         if self.generation_model is None:
             self.logger.error(
                 "Generation model is not set. Please set the generation model before generating text."
             )
-            return None
+            return False
+        return True
+
+    def is_embedding_ready(self) -> bool:
+        if self.client is None:
+            self.logger.error(
+                "Cohere client is not initialized. Please set the API key."
+            )
+            return False
+        if self.embedding_model is None:
+            self.logger.error(
+                "Embedding model is not set. Please set the embedding model before embedding text."
+            )
+            return False
+        return True
 
+    def build_chat_request(self, prompt: str, chat_history: list, max_output_tokens: int = None, temp: float = None) -> dict:
         if max_output_tokens is None:
             max_output_tokens = self.default_output_max_tokens
         if temp is None:
             temp = self.default_temp
 
         chat_history.append(self.construct_prompt(prompt, CohereEnums.USER.value))
-
-        response = self.client.chat(
-            model=self.generation_model,
-            messages=chat_history,
-            max_tokens=max_output_tokens,
-            temperature=temp,
-        )
-
+        return {
+            "model": self.generation_model,
+            "messages": chat_history,
+            "max_tokens": max_output_tokens,
+            "temperature": temp,
+        }
+
+    def parse_chat_response(self, response, chat_history: list):
         if not response or not response.message or not response.message.content:
             self.logger.error("Failed to get response from Cohere.")
             return None
@@ -78,48 +132,40 @@ class CohereProvider(LLMInterface):
 
         return answer
 
-    def embed_text(self, text: Union[str, List[str]], document_type: str):
-        if self.client is None:
-            # raise ValueError("OpenAI client is not initialized. Please set the API key and URL.")
-            self.logger.error(
-                "OpenAI client is not initialized. Please set the API key and URL."
-            )
-            return None
-        if self.embedding_model is None:
-            # raise ValueError("Embedding model is not set. Please set the embedding model before embedding text.")
-            self.logger.error(
-                "Embedding model is not set. Please set the embedding model before embedding text."
-            )
-            return None
-
+    def get_embedding_batches(self, text: Union[str, List[str]]) -> List[List[str]]:
         # Normalize input to a list of strings
         if isinstance(text, str):
             text = [text]
+        return self.get_embedding_batcher().split(text)
 
+    def build_embedding_request(self, batch: List[str], document_type: str) -> dict:
         if document_type == DocumentTypeEnums.DOCUMENT.value:
             input_type = CohereEnums.DOCUMENT.value
         if document_type == DocumentTypeEnums.QUERY.value:
             input_type = CohereEnums.QUERY.value
 
-        response = self.client.embed(
-            texts=text,
-            model=self.embedding_model,
-            input_type=input_type,
-            output_dimension=self.embedding_size,
-            embedding_types=["float"],
-        )
+        return {
+            "texts": batch,
+            "model": self.embedding_model,
+            "input_type": input_type,
+            "output_dimension": self.embedding_size,
+            "embedding_types": ["float"],
+        }
 
-        embeddings = response.embeddings.float
+    def parse_embedding_response(self, response, batch: List[str]):
         if (
             response is None
-            or embeddings is None
-            or len(embeddings) == 0
-            or response.embeddings.float[0] is None
+            or response.embeddings is None
+            or response.embeddings.float is None
+            or len(response.embeddings.float) != len(batch)
         ):
             self.logger.error("Failed to get embeddings from Cohere.")
             return None
 
-        return embeddings
+        return response.embeddings.float
+
+    def get_embedding_batcher(self) -> EmbeddingBatcher:
+        return EmbeddingBatcher(max_items=self.embedding_max_batch_items, max_tokens=self.embedding_max_batch_tokens)
 
     def construct_prompt(self, prompt: str, role: str):
         return {"role": role, "content": self.process_text(prompt)}
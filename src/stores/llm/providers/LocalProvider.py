@@ -0,0 +1,142 @@
+from ..LLMInterface import LLMInterface
+from ..LLMEnums import OpenAIEnums
+from typing import Union, List
+import numpy as np
+import functools
+import hashlib
+import logging
+import os
+import re
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def hash_feature(feature: str) -> int:
+    # stable across processes, unlike hash(); words repeat a lot, so most lookups are cached
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+
+
+class LocalProvider(LLMInterface):
+    """
+    Embeds text on the CPU in-process, without any network call.
+
+    The embedding model is a sentence-transformers model loaded from a local path. When
+    the path doesn't exist or sentence-transformers isn't installed, a deterministic
+    hashing embedder of the configured size is used instead. It only matches shared
+    words and character trigrams, enough for offline runs and benchmarks, not for
+    retrieval quality. Text generation is not supported.
+    """
+
+    # texts encoded together, there is no API limit
+    MAX_EMBEDDING_INPUTS = 256
+    MAX_EMBEDDING_TOKENS = None
+    HASHING_MODEL = "hashing"
+
+    def __init__(
+        self,
+        default_input_max_tokens: int = 1000,
+        embedding_max_batch_items: int = None,
+        num_threads: int = None,
+    ):
+        self.default_input_max_tokens = default_input_max_tokens
+        self.embedding_max_batch_items = embedding_max_batch_items or self.MAX_EMBEDDING_INPUTS
+        self.embedding_max_batch_tokens = self.MAX_EMBEDDING_TOKENS
+        # torch's intra-op threads when a model is loaded, torch picks them itself when None
+        self.num_threads = num_threads
+        self.generation_model = None
+        self.embedding_model = None
+        self.embedding_size = None
+        self.model = None
+        self.enums = OpenAIEnums
+        self.logger = logging.getLogger(__name__)
+
+    def process_text(self, text: str):
+        return text[: self.default_input_max_tokens].strip()
+
+    def set_generation_model(self, model_id: str):
+        self.generation_model = model_id
+
+    def set_embedding_model(self, model_id: str, embedding_size: int = None):
+        self.model = None
+        if model_id and os.path.exists(model_id):
+            if SentenceTransformer is None:
+                self.logger.warning("sentence-transformers is not installed, falling back to the hashing embedder")
+            else:
+                self.model = SentenceTransformer(model_id, device="cpu")
+                if self.num_threads:
+                    # installed with sentence-transformers
+                    import torch
+                    torch.set_num_threads(self.num_threads)
+                model_size = self.model.get_sentence_embedding_dimension()
+                if embedding_size and embedding_size != model_size:
+                    self.logger.warning(f"Embedding size {embedding_size} doesn't match the model's {model_size}, using {model_size}")
+                embedding_size = model_size
+        elif model_id and model_id != self.HASHING_MODEL:
+            self.logger.warning(f"No local embedding model at '{model_id}', falling back to the hashing embedder")
+
+        if self.model is None:
+            # hashed vectors must not share embedding cache entries with a model's
+            model_id = self.HASHING_MODEL
+        self.embedding_model = model_id
+        self.embedding_size = embedding_size
+
+    def generate_text(
+        self,
+        prompt: str,
+        chat_history: list = [],
+        max_output_tokens: int = None,
+        temp: float = None,
+    ):
+        self.logger.error("The local provider only supports embeddings, set GENERATION_BACKEND to a remote provider.")
+        return None
+
+    def embed_text(self, text: Union[str, List[str]], document_type: str):
+        if self.embedding_model is None:
+            self.logger.error(
+                "Embedding model is not set. Please set the embedding model before embedding text."
+            )
+            return None
+        if self.model is None and not self.embedding_size:
+            self.logger.error("The hashing embedder needs an embedding size, please set EMBEDDING_SIZE.")
+            return None
+
+        # Normalize input to a list of strings
+        if isinstance(text, str):
+            text = [text]
+
+        if self.model is not None:
+            # torch spreads each batch over the CPU cores itself
+            vectors = self.model.encode(text, batch_size=self.embedding_max_batch_items,
+                                        normalize_embeddings=True, convert_to_numpy=True)
+            return vectors.tolist()
+
+        # pure Python hashing holds the GIL, threads wouldn't help; the rest is one numpy pass
+        return self.hash_embed(text).tolist()
+
+    @staticmethod
+    def hash_features(text: str) -> List[str]:
+        words = re.findall(r"\w+", text.casefold())
+        # trigrams of the padded words, so inflected forms still overlap
+        trigrams = [padded[i:i + 3] for padded in (f"#{word}#" for word in words) for i in range(len(padded) - 2)]
+        return words + trigrams
+
+    def hash_embed(self, texts: List[str]) -> np.ndarray:
+        features = [self.hash_features(text) for text in texts]
+        rows = np.repeat(np.arange(len(texts)), [len(text_features) for text_features in features])
+        hashes = np.fromiter((hash_feature(feature) for text_features in features for feature in text_features),
+                             dtype=np.uint64, count=len(rows))
+        # the top bit signs each feature, so collisions cancel out instead of piling up
+        signs = np.where(hashes >> np.uint64(63), -1.0, 1.0).astype('float32')
+        columns = (hashes % np.uint64(self.embedding_size)).astype(np.int64)
+
+        vectors = np.zeros((len(texts), self.embedding_size), dtype='float32')
+        np.add.at(vectors, (rows, columns), signs)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1)
+
+    def construct_prompt(self, prompt: str, role: str):
+        return {"role": role, "content": self.process_text(prompt)}
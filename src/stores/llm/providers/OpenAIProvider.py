@@ -1,12 +1,20 @@
 from ..LLMInterface import LLMInterface
 from ..LLMEnums import LLMEnums, OpenAIEnums
-from openai import OpenAI
+from openai import OpenAI, NOT_GIVEN
 import os
 import logging
+from ..EmbeddingBatcher import EmbeddingBatcher
+from typing import Union, List
 
 
 class OpenAIProvider(LLMInterface):
 
+    # inputs and tokens per embeddings request accepted by the API
+    MAX_EMBEDDING_INPUTS = 2048
+    MAX_EMBEDDING_TOKENS = 300000
+    # models accepting `dimensions`; ada-002 and many OpenAI-compatible servers reject it
+    SHORTENABLE_EMBEDDING_MODELS = ("text-embedding-3",)
+
     def __init__(
         self,
         api_key: str,
@@ -14,19 +22,27 @@ class OpenAIProvider(LLMInterface):
         default_input_max_tokens: int = 1000,
         default_output_max_tokens: int = 1000,
         default_temp: float = 0.1,
+        embedding_max_batch_items: int = None,
+        embedding_max_batch_tokens: int = None,
     ):
         self.api_key = api_key
         self.base_url = base_url
         self.default_input_max_tokens = default_input_max_tokens
         self.default_output_max_tokens = default_output_max_tokens
         self.default_temp = default_temp
+        # settings override the API limits, e.g. for OpenAI-compatible servers with smaller ones
+        self.embedding_max_batch_items = embedding_max_batch_items or self.MAX_EMBEDDING_INPUTS
+        self.embedding_max_batch_tokens = embedding_max_batch_tokens or self.MAX_EMBEDDING_TOKENS
         self.generation_model = None
         self.embedding_model = None
         self.embedding_size = None
-        self.client = OpenAI(base_url=self.base_url, api_key=self.api_key)
+        self.client = self.create_client()
         self.enums = OpenAIEnums
         self.logger = logging.getLogger(__name__)
 
+    def create_client(self):
+        return OpenAI(base_url=self.base_url, api_key=self.api_key)
+
     def process_text(self, text: str):
         return text[: self.default_input_max_tokens].strip()
 
@@ -44,34 +60,71 @@ class OpenAIProvider(LLMInterface):
         max_output_tokens: int = None,
         temp: float = None,
     ):
+        if not self.is_generation_ready():
+            return None
+
+        request = self.build_chat_request(prompt, chat_history, max_output_tokens, temp)
+        response = self.client.chat.completions.create(**request)
+        return self.parse_chat_response(response, chat_history)
+
+    def embed_text(self, text: Union[str, List[str]], document_type: str):
+        if not self.is_embedding_ready():
+            return None
+
+        embeddings = []
+        # one request per sub-batch instead of one per text, within the request's item and token limits
+        for batch in self.get_embedding_batches(text):
+            response = self.client.embeddings.create(**self.build_embedding_request(batch))
+            vectors = self.parse_embedding_response(response, batch)
+            if vectors is None:
+                return None
+            embeddings.extend(vectors)
+
+        return embeddings
+
+    # request building and response parsing, shared with AsyncOpenAIProvider
 
+    def is_generation_ready(self) -> bool:
         if self.client is None:
-            # raise ValueError("OpenAI client is not initialized. Please set the API key and URL.")
             self.logger.error(
                 "OpenAI client is not initialized. Please set the API key and URL."
             )
-            return None
+            return False
         if self.generation_model is None:
-            # raise ValueError("Generation model is not set. Please set the generation model before generating text.")
             self.logger.error(
                 "Generation model is not set. Please set the generation model before generating text."
             )
-            return None
+            return False
+        return True
 
+    def is_embedding_ready(self) -> bool:
+        if self.client is None:
+            self.logger.error(
+                "OpenAI client is not initialized. Please set the API key and URL."
+            )
+            return False
+        if self.embedding_model is None:
+            self.logger.error(
+                "Embedding model is not set. Please set the embedding model before embedding text."
+            )
+            return False
+        return True
+
+    def build_chat_request(self, prompt: str, chat_history: list, max_output_tokens: int = None, temp: float = None) -> dict:
         if max_output_tokens is None:
             max_output_tokens = self.default_output_max_tokens
         if temp is None:
             temp = self.default_temp
 
         chat_history.append(self.construct_prompt(prompt, OpenAIEnums.USER.value))
-
-        response = self.client.chat.completions.create(
-            model=self.generation_model,
-            messages=chat_history,
-            max_tokens=max_output_tokens,
-            temperature=temp,
-        )
-
+        return {
+            "model": self.generation_model,
+            "messages": chat_history,
+            "max_tokens": max_output_tokens,
+            "temperature": temp,
+        }
+
+    def parse_chat_response(self, response, chat_history: list):
         if (
             not response
             or not response.choices
@@ -84,34 +137,37 @@ class OpenAIProvider(LLMInterface):
         answer = response.choices[0].message.content.strip()
         chat_history.append(self.construct_prompt(answer, OpenAIEnums.ASSISTANT.value))
         return answer
-        # raise NotImplementedError
-
-    def embed_text(self, text: str, document_type: str):
-        if self.client is None:
-            # raise ValueError("OpenAI client is not initialized. Please set the API key and URL.")
-            self.logger.error(
-                "OpenAI client is not initialized. Please set the API key and URL."
-            )
-            return None
-        if self.embedding_model is None:
-            # raise ValueError("Embedding model is not set. Please set the embedding model before embedding text.")
-            self.logger.error(
-                "Embedding model is not set. Please set the embedding model before embedding text."
-            )
-            return None
-
-        response = self.client.embeddings.create(input=text, model=self.embedding_model)
 
+    def get_embedding_batches(self, text: Union[str, List[str]]) -> List[List[str]]:
+        # Normalize input to a list of strings
+        if isinstance(text, str):
+            text = [text]
+        return self.get_embedding_batcher().split(text)
+
+    def build_embedding_request(self, batch: List[str]) -> dict:
+        shortenable = self.embedding_model.startswith(self.SHORTENABLE_EMBEDDING_MODELS)
+        return {
+            "input": batch,
+            "model": self.embedding_model,
+            # shortened embeddings of the configured size
+            "dimensions": self.embedding_size if self.embedding_size and shortenable else NOT_GIVEN,
+        }
+
+    def parse_embedding_response(self, response, batch: List[str]):
         if (
             not response
             or not response.data
-            or len(response.data) == 0
+            or len(response.data) != len(batch)
             or not response.data[0].embedding
         ):
             self.logger.error("Failed to get embedding from OpenAI.")
             return None
 
-        return response.data[0].embedding
+        # results carry the position of their input, keep the input order
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def get_embedding_batcher(self) -> EmbeddingBatcher:
+        return EmbeddingBatcher(max_items=self.embedding_max_batch_items, max_tokens=self.embedding_max_batch_tokens)
 
     def construct_prompt(self, prompt: str, role: str):
         return {"role": role, "content": self.process_text(prompt)}
@@ -1,2 +1,7 @@
 from .CohereProvider import CohereProvider
 from .OpenAIProvider import OpenAIProvider
+from .AsyncCohereProvider import AsyncCohereProvider
+from .AsyncOpenAIProvider import AsyncOpenAIProvider
+from .CachedEmbeddingProvider import CachedEmbeddingProvider
+from .LocalProvider import LocalProvider
+from .AsyncLocalProvider import AsyncLocalProvider
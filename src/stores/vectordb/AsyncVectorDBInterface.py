@@ -0,0 +1,68 @@
+from abc import ABC, abstractmethod
+from typing import List
+from ...models.db_schemes import RetrievedDocument
+
+
+class AsyncVectorDBInterface(ABC):
+
+    @abstractmethod
+    async def connect(self):
+        pass
+
+    @abstractmethod
+    async def disconnect(self):
+        pass
+
+    @abstractmethod
+    async def is_collection_existed(self, collection_name: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False,
+                                index_config: dict = None):
+        pass
+
+    @abstractmethod
+    async def list_all_collections(self) -> List:
+        pass
+
+    @abstractmethod
+    async def get_collection_info(self, collection_name: str) -> dict:
+        pass
+
+    @abstractmethod
+    async def delete_collection(self, collection_name: str):
+        pass
+
+    @abstractmethod
+    async def get_collection_generation(self, collection_name: str):
+        # token that changes whenever the collection's contents change, None if it can't be told
+        pass
+
+    @abstractmethod
+    async def insert_one(self, collection_name: str, text: str, vector: list, metadata: dict = None
+    , record_id: str = None, asset_id: int = None) -> str:
+        pass
+
+    @abstractmethod
+    async def insert_many(self, collection_name: str, texts: list, vectors: list, metadata: list = None
+    , record_ids: list = None, batch_size: int = None, asset_ids: list = None):
+        pass
+
+    @abstractmethod
+    async def delete_by_ids(self, collection_name: str, record_ids: list):
+        pass
+
+    @abstractmethod
+    async def delete_by_asset(self, collection_name: str, asset_id: int):
+        pass
+
+    @abstractmethod
+    async def search_by_vector(self, collection_name: str, vector: list, limit: int = 10,
+                               search_params: dict = None, filters: dict = None) -> List[RetrievedDocument]:
+        pass
+
+    @abstractmethod
+    async def search_by_vectors(self, collection_name: str, vectors: list, limit: int = 10,
+                                search_params: dict = None, filters: dict = None) -> List[List[RetrievedDocument]]:
+        pass
@@ -0,0 +1,39 @@
+import hashlib
+import json
+import numpy as np
+from collections import OrderedDict
+from typing import List, Optional
+from ...models.db_schemes import RetrievedDocument
+
+
+class SearchResultCache:
+    """
+    In-process LRU cache of vector search results.
+
+    Keys include the collection's generation, which changes with every write, so a
+    result is only ever served for the exact collection contents it was computed on;
+    entries of older generations are never hit again and age out of the LRU.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    @staticmethod
+    def make_key(collection_name: str, generation, vector: list, limit: int, search_params: dict = None,
+                 filters: dict = None) -> tuple:
+        vector_hash = hashlib.sha1(np.asarray(vector, dtype='float32').tobytes()).hexdigest()
+        options = json.dumps([search_params, filters], sort_keys=True, default=str)
+        return (collection_name, generation, vector_hash, limit, options)
+
+    def get(self, key: tuple) -> Optional[List[RetrievedDocument]]:
+        results = self.entries.get(key)
+        if results is not None:
+            self.entries.move_to_end(key)
+        return results
+
+    def put(self, key: tuple, results: List[RetrievedDocument]):
+        self.entries[key] = results
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
@@ -5,9 +5,24 @@ class VectorDBEnums(Enum):
 
     QDRANT = "qdrant"
     FAISS = "faiss"
+    PGVECTOR = "pgvector"
 
 class DistanceMethodEnums(Enum):
     
     COSINE = "Cosine"
     EUCLIDEAN = "Euclidean"
-    DOT = "Dot"
\ No newline at end of file
+    DOT = "Dot"
+
+class FaissIndexTypeEnums(Enum):
+
+    FLAT = "FLAT"
+    IVF_FLAT = "IVF_FLAT"
+    IVF_PQ = "IVF_PQ"
+    HNSW = "HNSW"
+
+class QuantizationEnums(Enum):
+
+    NONE = "NONE"
+    SQ8 = "SQ8"
+    FP16 = "FP16"
+    PQ = "PQ"
\ No newline at end of file
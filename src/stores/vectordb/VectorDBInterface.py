@@ -18,7 +18,8 @@ class VectorDBInterface(ABC):
         pass
 
     @abstractmethod
-    def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False):
+    def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False,
+                          index_config: dict = None):
         pass
 
     @abstractmethod
@@ -33,16 +34,35 @@ class VectorDBInterface(ABC):
     def delete_collection(self, collection_name: str):
         pass
 
+    @abstractmethod
+    def get_collection_generation(self, collection_name: str):
+        # token that changes whenever the collection's contents change, None if it can't be told
+        pass
+
     @abstractmethod
     def insert_one(self, collection_name: str, text: str, vector: list, metadata: dict = None
-    , record_id: str = None) -> str:
+    , record_id: str = None, asset_id: int = None) -> str:
         pass
 
     @abstractmethod
     def insert_many(self, collection_name: str, texts: list, vectors: list, metadata: list = None
-    , record_ids: list = None, batch_size: int = 50):
+    , record_ids: list = None, batch_size: int = None, asset_ids: list = None):
+        pass
+
+    @abstractmethod
+    def delete_by_ids(self, collection_name: str, record_ids: list):
+        pass
+
+    @abstractmethod
+    def delete_by_asset(self, collection_name: str, asset_id: int):
+        pass
+
+    @abstractmethod
+    def search_by_vector(self, collection_name: str, vector: list, limit: int = 10,
+                         search_params: dict = None, filters: dict = None) -> List[RetrievedDocument]:
         pass
 
     @abstractmethod
-    def search_by_vector(self, collection_name: str, vector: list, limit: int = 10) -> List[RetrievedDocument]:
+    def search_by_vectors(self, collection_name: str, vectors: list, limit: int = 10,
+                          search_params: dict = None, filters: dict = None) -> List[List[RetrievedDocument]]:
         pass
\ No newline at end of file
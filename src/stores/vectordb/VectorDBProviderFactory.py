@@ -1,22 +1,102 @@
 from ..vectordb.providers.QdrantDB import QdrantDB
 from ..vectordb.providers.FaissDB import FaissDB
+from ..vectordb.providers.ThreadPoolVectorDB import ThreadPoolVectorDB
+from ..vectordb.providers.PGVectorDB import PGVectorDB
+from ..vectordb.providers.CachedVectorDB import CachedVectorDB
+from ..vectordb.SearchResultCache import SearchResultCache
 from ..vectordb.VectorDBEnums import VectorDBEnums
 from ...controllers import BaseController
 
 class VectorDBProviderFactory:
 
-    def __init__(self, config):
+    def __init__(self, config, db_client=None):
         self.config = config
+        # session factory of the app database, used by the pgvector backend
+        self.db_client = db_client
         self.base_controller = BaseController()
 
     def create(self, provider: str):
         if provider == VectorDBEnums.QDRANT.value:
             db_path = self.base_controller.get_database_path(self.config.VECTOR_DB_PATH)
             distance_method = self.config.VECTOR_DB_DISTANCE_METHOD
-            return QdrantDB(db_path=db_path, distance_method=distance_method)
+            return QdrantDB(
+                db_path=db_path,
+                distance_method=distance_method,
+                default_index_config={
+                    "quantization": self.config.VECTOR_DB_QUANTIZATION,
+                    "hnsw_m": self.config.QDRANT_HNSW_M,
+                    "hnsw_ef_construction": self.config.QDRANT_HNSW_EF_CONSTRUCT,
+                    "on_disk": self.config.QDRANT_ON_DISK,
+                    "on_disk_payload": self.config.QDRANT_ON_DISK_PAYLOAD,
+                },
+                default_search_params={
+                    "ef_search": self.config.QDRANT_HNSW_EF_SEARCH,
+                    "rescore_factor": self.config.VECTOR_DB_RESCORE_FACTOR,
+                },
+                url=self.config.QDRANT_URL,
+                upload_batch_size=self.config.QDRANT_UPLOAD_BATCH_SIZE or 256,
+                upload_parallel=self.config.QDRANT_UPLOAD_PARALLEL or 1,
+                upload_wait=self.config.QDRANT_UPLOAD_WAIT is not False
+            )
         if provider == VectorDBEnums.FAISS.value:
             db_path = self.base_controller.get_database_path(self.config.VECTOR_DB_PATH)
             distance_method = self.config.VECTOR_DB_DISTANCE_METHOD
-            return FaissDB(db_path=db_path, distance_method=distance_method)
+            return FaissDB(
+                db_path=db_path,
+                distance_method=distance_method,
+                cache_max_memory_mb=self.config.FAISS_CACHE_MAX_MEMORY_MB,
+                wal_compaction_threshold_mb=self.config.FAISS_WAL_COMPACTION_THRESHOLD_MB,
+                default_index_config={
+                    "index_type": self.config.FAISS_INDEX_TYPE,
+                    "nlist": self.config.FAISS_IVF_NLIST,
+                    "pq_m": self.config.FAISS_PQ_M,
+                    "pq_nbits": self.config.FAISS_PQ_NBITS,
+                    "hnsw_m": self.config.FAISS_HNSW_M,
+                    "hnsw_ef_construction": self.config.FAISS_HNSW_EF_CONSTRUCTION,
+                    "train_min_vectors": self.config.FAISS_TRAIN_MIN_VECTORS,
+                    "num_shards": self.config.FAISS_NUM_SHARDS,
+                    "quantization": self.config.VECTOR_DB_QUANTIZATION,
+                },
+                default_search_params={
+                    "nprobe": self.config.FAISS_NPROBE,
+                    "ef_search": self.config.FAISS_HNSW_EF_SEARCH,
+                    "rescore_factor": self.config.VECTOR_DB_RESCORE_FACTOR,
+                }
+            )
         else:
-            raise ValueError(f"Unsupported vector DB provider: {provider}")
\ No newline at end of file
+            raise ValueError(f"Unsupported vector DB provider: {provider}")
+
+    def create_async(self, provider: str):
+        vector_db_client = self.create_async_client(provider)
+        # repeated searches against an unchanged collection are served from memory
+        if self.config.SEARCH_CACHE_SIZE:
+            return CachedVectorDB(
+                vector_db_client=vector_db_client,
+                search_cache=SearchResultCache(max_entries=self.config.SEARCH_CACHE_SIZE)
+            )
+        return vector_db_client
+
+    def create_async_client(self, provider: str):
+        if provider == VectorDBEnums.PGVECTOR.value:
+            # natively async, it shares the app's engine
+            return PGVectorDB(
+                db_client=self.db_client,
+                distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
+                default_index_config={
+                    "index_type": self.config.PGVECTOR_INDEX_TYPE,
+                    "nlist": self.config.PGVECTOR_IVF_LISTS,
+                    "hnsw_m": self.config.PGVECTOR_HNSW_M,
+                    "hnsw_ef_construction": self.config.PGVECTOR_HNSW_EF_CONSTRUCTION,
+                    "train_min_vectors": self.config.PGVECTOR_TRAIN_MIN_VECTORS,
+                },
+                default_search_params={
+                    "nprobe": self.config.PGVECTOR_IVF_PROBES,
+                    "ef_search": self.config.PGVECTOR_HNSW_EF_SEARCH,
+                }
+            )
+        # the embedded providers block, so their calls go to a bounded thread pool
+        vector_db_client = self.create(provider)
+        return ThreadPoolVectorDB(
+            vector_db_client=vector_db_client,
+            max_workers=self.config.VECTOR_DB_MAX_WORKERS or 4
+        )
\ No newline at end of file
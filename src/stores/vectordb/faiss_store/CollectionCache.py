@@ -0,0 +1,89 @@
+import threading
+import logging
+from collections import OrderedDict
+from typing import Callable, Optional
+from .FaissCollection import FaissCollection
+
+
+class CollectionCache:
+    """
+    Process-wide LRU cache of opened FAISS collections bounded by a memory budget.
+    """
+
+    def __init__(self, max_memory_bytes: Optional[int] = None):
+        self.max_memory_bytes = max_memory_bytes
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.load_locks = {}
+        self.logger = logging.getLogger(__name__)
+
+    def get_load_lock(self, name: str) -> threading.Lock:
+        with self.lock:
+            if name not in self.load_locks:
+                self.load_locks[name] = threading.Lock()
+            return self.load_locks[name]
+
+    def get(self, name: str) -> Optional[FaissCollection]:
+        with self.lock:
+            collection = self.entries.get(name)
+            if collection is not None:
+                self.entries.move_to_end(name)
+            return collection
+
+    def get_or_load(self, name: str, loader: Callable[[], FaissCollection]) -> FaissCollection:
+        collection = self.get(name)
+        if collection is not None and not collection.is_stale():
+            return collection
+
+        # one loader per collection, so concurrent requests don't deserialize the same files twice
+        with self.get_load_lock(name):
+            collection = self.get(name)
+            if collection is not None and not collection.is_stale():
+                return collection
+            collection = loader()
+            self.put(name, collection)
+            return collection
+
+    def put(self, name: str, collection: FaissCollection):
+        with self.lock:
+            previous = self.entries.get(name)
+            if previous is not None and previous is not collection:
+                # a stale copy replaced by a reload
+                previous.close()
+            self.entries[name] = collection
+            self.entries.move_to_end(name)
+            self.evict()
+
+    def invalidate(self, name: str):
+        with self.lock:
+            collection = self.entries.pop(name, None)
+            if collection is not None:
+                collection.close()
+
+    def clear(self):
+        with self.lock:
+            for collection in self.entries.values():
+                collection.close()
+            self.entries.clear()
+
+    def resize(self):
+        # call after a collection grew so the budget is enforced again
+        with self.lock:
+            self.evict()
+
+    def memory_usage(self) -> int:
+        return sum(collection.size_bytes for collection in self.entries.values())
+
+    def evict(self):
+        if self.max_memory_bytes is None:
+            return
+        # never evict the most recently used collection, even if it alone exceeds the budget
+        while len(self.entries) > 1 and self.memory_usage() > self.max_memory_bytes:
+            name, collection = self.entries.popitem(last=False)
+            # release the payload store's SQLite connection, a later access loads the collection again
+            collection.close()
+            self.logger.info(f"Evicted FAISS collection '{name}' from memory cache")
+        if self.memory_usage() > self.max_memory_bytes:
+            self.logger.warning(
+                f"FAISS collection cache exceeds its budget of {self.max_memory_bytes} bytes"
+            )
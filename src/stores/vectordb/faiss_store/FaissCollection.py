@@ -0,0 +1,348 @@
+import os
+import glob
+import uuid
+import faiss
+import itertools
+import threading
+import numpy as np
+from typing import NamedTuple
+from .PayloadStore import PayloadStore
+from .WriteAheadLog import WriteAheadLog
+from .IndexBuilder import IndexBuilder
+from .FileLock import FileLock
+from .ShardedIndex import merge_search_results, copy_index, read_back_vectors, read_index_file, write_index_file
+
+
+# process-wide, so a reloaded or re-created collection never repeats an earlier generation
+GENERATIONS = itertools.count(1)
+
+
+class CollectionSnapshot(NamedTuple):
+    """Immutable view of a collection's indexes; searches run against one without locking."""
+    index: object
+    # small flat IndexIDMap segments holding everything appended since the main index was written
+    segments: tuple
+    # ids removed (or replaced) from the main index since it was written
+    tombstones: frozenset
+    generation: int
+
+    @property
+    def delta_ntotal(self) -> int:
+        return sum(segment.ntotal for segment in self.segments)
+
+
+class FaissCollection:
+    """
+    In-memory view of one FAISS collection.
+
+    Vectors live in the main index as last written to disk plus flat delta segments
+    holding everything appended to the write-ahead log since. Searches query both;
+    compaction folds the delta into the main index and, once enough vectors exist,
+    trains the configured ANN index. Removed ids are masked out of main index searches
+    until compaction deletes them for real.
+
+    Nothing reachable from a published snapshot is ever modified: writers build the
+    next generation (new segments, a cloned main index on compaction) and swap the
+    snapshot pointer, so searches never wait for inserts or compaction.
+    """
+
+    # appends beyond this many segments are coalesced into one
+    MAX_DELTA_SEGMENTS = 16
+
+    def __init__(self, name: str, index, payload_store: PayloadStore, index_path: str, wal: WriteAheadLog,
+                 index_builder: IndexBuilder, file_lock: FileLock):
+        self.name = name
+        self.index_builder = index_builder
+        self.payload_store = payload_store
+        self.index_path = index_path
+        self.wal = wal
+        # coordinates log writes and compactions with the other processes sharing the files
+        self.file_lock = file_lock
+        self.snapshot = CollectionSnapshot(index=index, segments=(), tombstones=frozenset(), generation=next(GENERATIONS))
+        self.deleted = False
+        # serializes writers (add / remove / compact); searches only read self.snapshot
+        self.lock = threading.Lock()
+        # epoch of the log the main index belongs to and how much of it has been applied,
+        # other processes may have appended past it
+        self.wal_epoch = self.wal.epoch()
+        self.wal_offset = 0
+        self.replay_wal()
+        self.disk_signature = self.read_disk_signature()
+
+    @property
+    def index(self):
+        return self.snapshot.index
+
+    @property
+    def tombstones(self) -> frozenset:
+        return self.snapshot.tombstones
+
+    @property
+    def generation(self) -> int:
+        return self.snapshot.generation
+
+    @property
+    def higher_is_better(self) -> bool:
+        return self.index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+    @property
+    def ntotal(self) -> int:
+        return self.snapshot.index.ntotal + self.snapshot.delta_ntotal
+
+    def publish(self, **changes):
+        # a single attribute assignment, so readers see either the old or the new generation
+        self.snapshot = self.snapshot._replace(generation=next(GENERATIONS), **changes)
+
+    def replay_wal(self):
+        # applies what other processes wrote since this one last read the log;
+        # callers hold the file lock
+        epoch = self.wal.epoch()
+        if epoch != self.wal_epoch:
+            # another process compacted, its index holds everything logged before
+            self.finish_compaction(self.index_path, self.wal)
+            self.publish(index=read_index_file(self.index_path), segments=(), tombstones=frozenset())
+            self.wal_epoch, self.wal_offset = epoch, 0
+
+        for op, ids, vectors, end in self.wal.replay(self.wal_offset):
+            if op == WriteAheadLog.OP_ADD:
+                self.apply_add(ids, vectors)
+            elif op == WriteAheadLog.OP_REMOVE:
+                self.apply_remove(ids)
+            self.wal_offset = end
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray):
+        # durable first, then visible to searches
+        with self.file_lock.acquire():
+            self.replay_wal()
+            self.wal_offset = self.wal.append(WriteAheadLog.OP_ADD, ids, vectors)
+            self.apply_add(ids, vectors)
+            self.refresh_disk_signature()
+
+    def apply_add(self, ids: np.ndarray, vectors: np.ndarray):
+        segments = self.snapshot.segments + (self.build_segment(ids, vectors),)
+        if len(segments) > self.MAX_DELTA_SEGMENTS:
+            segments = (self.merge_segments(segments),)
+        self.publish(segments=segments)
+
+    def remove(self, ids: np.ndarray):
+        with self.file_lock.acquire():
+            self.replay_wal()
+            self.wal_offset = self.wal.append(WriteAheadLog.OP_REMOVE, ids)
+            self.apply_remove(ids)
+            self.refresh_disk_signature()
+
+    def apply_remove(self, ids: np.ndarray):
+        ids = np.ascontiguousarray(ids, dtype='int64')
+        segments = []
+        for segment in self.snapshot.segments:
+            segment_ids = faiss.vector_to_array(segment.id_map)
+            removed = np.isin(segment_ids, ids)
+            if not removed.any():
+                segments.append(segment)
+                continue
+            # segments are shared with in-flight searches, rebuild instead of removing in place
+            keep = ~removed
+            if keep.any():
+                vectors = segment.index.reconstruct_n(0, segment.ntotal)
+                segments.append(self.build_segment(segment_ids[keep], vectors[keep]))
+        self.publish(segments=tuple(segments), tombstones=self.snapshot.tombstones | set(int(vid) for vid in ids))
+
+    def build_segment(self, ids: np.ndarray, vectors: np.ndarray):
+        segment = faiss.IndexIDMap(faiss.IndexFlat(self.index.d, self.index.metric_type))
+        segment.add_with_ids(np.ascontiguousarray(vectors, dtype='float32'), np.ascontiguousarray(ids, dtype='int64'))
+        return segment
+
+    def merge_segments(self, segments):
+        ids = np.concatenate([faiss.vector_to_array(segment.id_map) for segment in segments])
+        vectors = np.vstack([segment.index.reconstruct_n(0, segment.ntotal) for segment in segments])
+        return self.build_segment(ids, vectors)
+
+    @property
+    def is_staging(self) -> bool:
+        return self.index_builder.requires_training and IndexBuilder.is_staging_index(self.index)
+
+    def search(self, queries: np.ndarray, limit: int, search_params: dict = None, allowed_ids: list = None):
+        search_params = search_params or {}
+        # one snapshot for the whole search, writers publishing meanwhile don't affect it
+        snapshot = self.snapshot
+        # keep references to the selectors for as long as the search runs
+        selector, delta_selector = None, None
+        if allowed_ids is not None:
+            # metadata filters are resolved to ids up front and pushed into the index search;
+            # tombstones only mask the main index, an upserted id lives on in a delta segment
+            allowed = np.array(sorted(set(allowed_ids) - snapshot.tombstones), dtype='int64')
+            selector = faiss.IDSelectorBatch(allowed)
+            delta_selector = faiss.IDSelectorBatch(np.array(sorted(set(allowed_ids)), dtype='int64'))
+        elif snapshot.tombstones:
+            removed_selector = faiss.IDSelectorBatch(np.array(list(snapshot.tombstones), dtype='int64'))
+            selector = faiss.IDSelectorNot(removed_selector)
+        params = IndexBuilder.get_search_parameters(snapshot.index, search_params, selector=selector)
+        delta_params = faiss.SearchParameters(sel=delta_selector) if delta_selector is not None else None
+
+        # quantized indexes over-fetch candidates and re-rank them on the original vectors
+        rescore_factor = search_params.get("rescore_factor") or 1
+        rescore = self.index_builder.is_lossy and search_params.get("rescore") is not False and rescore_factor > 1
+        num_candidates = limit * rescore_factor if rescore else limit
+
+        if snapshot.index.ntotal > 0:
+            D, I = snapshot.index.search(queries, num_candidates, params=params)
+        else:
+            # faiss crashes on batched searches over an empty flat index, and there is nothing to find anyway
+            D = np.zeros((len(queries), num_candidates), dtype='float32')
+            I = np.full((len(queries), num_candidates), -1, dtype='int64')
+        if snapshot.delta_ntotal > 0:
+            distances, ids = [D], [I]
+            for segment in snapshot.segments:
+                segment_D, segment_I = segment.search(queries, num_candidates, params=delta_params)
+                distances.append(segment_D)
+                ids.append(segment_I)
+            D, I = merge_search_results(distances, ids, num_candidates, self.higher_is_better)
+
+        if rescore:
+            D, I = self.rescore(queries, D, I)
+        return D[:, :limit], I[:, :limit]
+
+    def rescore(self, queries: np.ndarray, D: np.ndarray, I: np.ndarray):
+        D = D.copy()
+        stored_vectors = self.payload_store.get_vectors(np.unique(I[I >= 0]))
+        for row, query in enumerate(queries):
+            for col, vid in enumerate(I[row]):
+                vector = stored_vectors.get(int(vid))
+                if vector is None:
+                    # rows written before the collection kept raw vectors keep their approximate score
+                    continue
+                if self.higher_is_better:
+                    D[row, col] = float(np.dot(vector, query))
+                else:
+                    D[row, col] = float(np.sum((vector - query) ** 2))
+        return merge_search_results([D], [I], I.shape[1], self.higher_is_better)
+
+    def needs_compaction(self, threshold_bytes: int) -> bool:
+        if self.is_staging and self.ntotal >= self.index_builder.training_threshold:
+            return True
+        return self.wal.size_bytes() >= threshold_bytes
+
+    def compact(self):
+        # fold the delta segments into a new generation of the main index and persist it;
+        # callers hold self.lock, searches keep running against the previous snapshot
+        if self.deleted:
+            return
+        # held throughout: the log is reset below, records other processes append
+        # meanwhile would be lost
+        with self.file_lock.acquire():
+            self.replay_wal()
+            self.refresh_disk_signature()
+            snapshot = self.snapshot
+            train = self.is_staging and self.ntotal >= self.index_builder.training_threshold
+            if snapshot.delta_ntotal == 0 and not snapshot.tombstones and not train:
+                return
+            index = self.build_compacted_index(snapshot, train)
+
+            # the new index file is named after the next log epoch, and resetting the log to
+            # that epoch commits it: a crash before leaves the old index and the full log, a
+            # crash after is rolled forward on the next load, the log is never replayed twice
+            epoch = self.wal_epoch + 1
+            token = uuid.uuid4().hex[:16]
+            pending_path = self.get_pending_index_path(self.index_path, epoch, token)
+            write_index_file(index, pending_path)
+            self.wal_offset = self.wal.reset(epoch, token)
+            self.wal_epoch = epoch
+            os.replace(pending_path, self.index_path)
+
+            self.publish(index=index, segments=(), tombstones=frozenset())
+            self.refresh_disk_signature()
+
+    def build_compacted_index(self, snapshot: CollectionSnapshot, train: bool):
+        # copy-on-write: the published main index may be in use by searches
+        index = copy_index(snapshot.index)
+
+        # removals first: an upserted id has its old vector in the main index and
+        # its new one in the delta
+        if snapshot.tombstones:
+            index = self.remove_from_index(index, np.array(list(snapshot.tombstones), dtype='int64'))
+
+        for segment in snapshot.segments:
+            ids = faiss.vector_to_array(segment.id_map).astype('int64')
+            vectors = segment.index.reconstruct_n(0, segment.ntotal)
+            index.add_with_ids(vectors, ids)
+
+        if train:
+            # the staging index is flat, so every vector can be read back for training
+            ids, vectors = read_back_vectors(index)
+            index = self.index_builder.train_and_build(ids, vectors)
+        return index
+
+    @staticmethod
+    def get_pending_index_path(index_path: str, epoch: int, token: str = "") -> str:
+        # the token makes the name unique per compaction, logs written before it was kept have none
+        return f"{index_path}.{epoch}.{token}.tmp" if token else f"{index_path}.{epoch}.tmp"
+
+    @classmethod
+    def finish_compaction(cls, index_path: str, wal: WriteAheadLog):
+        # installs an index whose log reset was committed but that wasn't renamed into place
+        # yet, and drops files of compactions that crashed before committing;
+        # callers hold the file lock, so no compaction is in progress
+        _, epoch, token = wal.read_header()
+        pending_path = cls.get_pending_index_path(index_path, epoch, token)
+        leftovers = glob.glob(f"{glob.escape(index_path)}.*.tmp") + glob.glob(f"{glob.escape(wal.path)}.*.tmp")
+        for path in leftovers:
+            try:
+                if path == pending_path:
+                    os.replace(pending_path, index_path)
+                else:
+                    os.remove(path)
+            except FileNotFoundError:
+                # another process sharing the lock finished it first
+                pass
+
+    def remove_from_index(self, index, ids: np.ndarray):
+        try:
+            index.remove_ids(faiss.IDSelectorBatch(ids))
+            return index
+        except RuntimeError:
+            # HNSW graphs can't drop nodes, rebuild the index without them
+            pass
+
+        all_ids, vectors = read_back_vectors(index)
+        keep = ~np.isin(all_ids, ids)
+        all_ids, vectors = all_ids[keep], vectors[keep]
+        if len(all_ids) == 0:
+            return self.index_builder.build_initial_index()
+
+        # prefer the original vectors over ones decoded from a quantized index
+        stored_vectors = self.payload_store.get_vectors(all_ids)
+        for row, vid in enumerate(all_ids):
+            if int(vid) in stored_vectors:
+                vectors[row] = stored_vectors[int(vid)]
+        return self.index_builder.train_and_build(all_ids, vectors)
+
+    def read_disk_signature(self):
+        # (mtime, size) of the index file and the log, used to detect writes made by
+        # another process (e.g. another uvicorn worker)
+        try:
+            index_stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        wal_stat = os.stat(self.wal.path) if os.path.exists(self.wal.path) else None
+        wal_signature = (wal_stat.st_mtime_ns, wal_stat.st_size) if wal_stat else None
+        return (index_stat.st_mtime_ns, index_stat.st_size, wal_signature)
+
+    def is_stale(self) -> bool:
+        if self.lock.locked():
+            # a writer in this process is changing the files right now, the change is ours
+            return False
+        return self.read_disk_signature() != self.disk_signature
+
+    def refresh_disk_signature(self):
+        self.disk_signature = self.read_disk_signature()
+
+    @property
+    def size_bytes(self) -> int:
+        # the serialized index and log are a close approximation of the resident size,
+        # payloads are memory-mapped by SQLite and not counted
+        if self.disk_signature is None:
+            return 0
+        return self.disk_signature[1] + self.wal.size_bytes()
+
+    def close(self):
+        self.payload_store.close()
@@ -0,0 +1,31 @@
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # no flock on Windows, a single worker process is assumed there
+    fcntl = None
+
+
+class FileLock:
+    """
+    Advisory lock on a file, shared by every process opening the same collection.
+
+    Each acquisition opens its own file description, so threads of one process exclude
+    each other the same way separate processes (e.g. uvicorn workers) do. Closing the
+    descriptor releases the lock, including when the process dies while holding it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @contextmanager
+    def acquire(self, shared: bool = False):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
@@ -0,0 +1,146 @@
+import math
+import faiss
+import numpy as np
+from ..VectorDBEnums import FaissIndexTypeEnums, QuantizationEnums
+from .ShardedIndex import ShardedIndex
+
+
+class IndexBuilder:
+    """
+    Builds the FAISS index described by a collection's index config.
+
+    Index types that need training (IVF, PQ, SQ8) start out as a flat staging index;
+    once the collection holds enough vectors the compaction step trains the target
+    index on them and swaps it in. With num_shards > 1 the main index is a ShardedIndex
+    whose shards share one trained quantizer.
+    """
+
+    def __init__(self, dimension: int, metric: int, config: dict):
+        self.dimension = dimension
+        self.metric = metric
+        self.config = config
+        self.index_type = config.get("index_type") or FaissIndexTypeEnums.FLAT.value
+        self.quantization = config.get("quantization") or QuantizationEnums.NONE.value
+        self.num_shards = config.get("num_shards") or 1
+
+        if self.index_type not in [index_type.value for index_type in FaissIndexTypeEnums]:
+            raise ValueError(f"Unsupported FAISS index type: {self.index_type}")
+
+        if self.quantization not in [quantization.value for quantization in QuantizationEnums]:
+            raise ValueError(f"Unsupported quantization: {self.quantization}")
+
+        if self.num_shards < 1:
+            raise ValueError(f"Number of shards must be at least 1, got {self.num_shards}")
+
+        if self.uses_pq and dimension % self.pq_m != 0:
+            raise ValueError(f"PQ sub-quantizers ({self.pq_m}) must divide the embedding size ({dimension})")
+
+        self.requires_training = not self.build_index().is_trained
+
+    @property
+    def pq_m(self) -> int:
+        if self.config.get("pq_m"):
+            return self.config["pq_m"]
+        # largest divisor of the dimension giving sub-vectors of at least 8 floats
+        divisors = [m for m in range(1, self.dimension // 8 + 1) if self.dimension % m == 0]
+        return max(divisors) if divisors else 1
+
+    @property
+    def uses_pq(self) -> bool:
+        return self.index_type == FaissIndexTypeEnums.IVF_PQ.value or self.quantization == QuantizationEnums.PQ.value
+
+    @property
+    def is_lossy(self) -> bool:
+        # scores from these indexes are approximate and benefit from exact rescoring
+        return self.uses_pq or self.quantization != QuantizationEnums.NONE.value
+
+    @property
+    def training_threshold(self) -> int:
+        threshold = self.config.get("train_min_vectors") or 10000
+        if self.uses_pq:
+            # the PQ codebooks need at least one training point per centroid
+            threshold = max(threshold, 2 ** (self.config.get("pq_nbits") or 8))
+        return threshold
+
+    def get_nlist(self, num_vectors: int) -> int:
+        nlist = self.config.get("nlist") or int(4 * math.sqrt(num_vectors))
+        # k-means wants ~39 points per centroid, fewer lists beat a badly trained quantizer
+        return max(1, min(nlist, num_vectors // 39))
+
+    def get_encoding(self) -> str:
+        # how the vectors themselves are stored inside the index
+        if self.uses_pq:
+            return f"PQ{self.pq_m}x{self.config.get('pq_nbits') or 8}"
+        if self.quantization == QuantizationEnums.SQ8.value:
+            return "SQ8"
+        if self.quantization == QuantizationEnums.FP16.value:
+            return "SQfp16"
+        return "Flat"
+
+    def get_factory_string(self, num_vectors: int = 0) -> str:
+        encoding = self.get_encoding()
+        if self.index_type in [FaissIndexTypeEnums.IVF_FLAT.value, FaissIndexTypeEnums.IVF_PQ.value]:
+            return f"IVF{self.get_nlist(num_vectors)},{encoding}"
+        if self.index_type == FaissIndexTypeEnums.HNSW.value:
+            hnsw = f"HNSW{self.config.get('hnsw_m') or 32}"
+            return f"IDMap,{hnsw}" if encoding == "Flat" else f"IDMap,{hnsw}_{encoding}"
+        if self.uses_pq:
+            # IndexPQ rejects id selectors (filters, tombstones), a single inverted list
+            # scans the same codes exhaustively and takes them
+            return f"IVF1,{encoding}"
+        return f"IDMap,{encoding}"
+
+    def build_staging_index(self):
+        return faiss.index_factory(self.dimension, "IDMap,Flat", self.metric)
+
+    def build_initial_index(self):
+        # what a new collection starts with
+        build = self.build_staging_index if self.requires_training else self.build_index
+        if self.num_shards > 1:
+            return ShardedIndex([build() for _ in range(self.num_shards)])
+        return build()
+
+    def build_index(self, num_vectors: int = 0):
+        index = faiss.index_factory(self.dimension, self.get_factory_string(num_vectors), self.metric)
+        if self.index_type == FaissIndexTypeEnums.HNSW.value:
+            faiss.downcast_index(index.index).hnsw.efConstruction = self.config.get("hnsw_ef_construction") or 40
+        return index
+
+    def train_and_build(self, ids: np.ndarray, vectors: np.ndarray, max_training_vectors: int = 100000):
+        # each shard holds ~1/num_shards of the vectors, size the IVF lists for that
+        index = self.build_index(num_vectors=len(ids) // self.num_shards)
+        training_vectors = vectors
+        if len(vectors) > max_training_vectors:
+            sample = np.random.default_rng(0).choice(len(vectors), max_training_vectors, replace=False)
+            training_vectors = vectors[sample]
+        index.train(training_vectors)
+        if self.num_shards > 1:
+            # train once, every shard starts from a copy of the trained empty index
+            index = ShardedIndex([faiss.clone_index(index) for _ in range(self.num_shards)])
+        index.add_with_ids(vectors, ids)
+        return index
+
+    @staticmethod
+    def is_staging_index(index) -> bool:
+        if isinstance(index, ShardedIndex):
+            index = index.shards[0]
+        index = faiss.downcast_index(index)
+        return isinstance(index, faiss.IndexIDMap) and isinstance(faiss.downcast_index(index.index), faiss.IndexFlat)
+
+    @staticmethod
+    def get_search_parameters(index, search_params: dict = None, selector=None):
+        search_params = search_params or {}
+        if isinstance(index, ShardedIndex):
+            # all shards are the same kind of index, one parameter object serves them all
+            index = index.shards[0]
+        index = faiss.downcast_index(index)
+        inner_index = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+
+        if isinstance(inner_index, faiss.IndexIVF) and (search_params.get("nprobe") or selector is not None):
+            # IVF indexes reject the generic parameter type, so a selector alone still needs the IVF flavour
+            return faiss.SearchParametersIVF(nprobe=search_params.get("nprobe") or inner_index.nprobe, sel=selector)
+        if isinstance(inner_index, faiss.IndexHNSW) and search_params.get("ef_search"):
+            return faiss.SearchParametersHNSW(efSearch=search_params["ef_search"], sel=selector)
+        if selector is not None:
+            return faiss.SearchParameters(sel=selector)
+        return None
@@ -0,0 +1,150 @@
+import json
+import sqlite3
+import threading
+import numpy as np
+from typing import Dict, List, Optional
+
+
+class PayloadStore:
+    """
+    On-disk store for the text and metadata of every vector in a FAISS collection.
+
+    Backed by a single SQLite file keyed by the vector id, memory-mapped for reads,
+    so inserts append rows instead of rewriting the whole map and searches only
+    read the rows of the top-k ids. Quantized collections also keep the original
+    float32 vector of each row here for exact rescoring.
+    """
+
+    def __init__(self, db_path: str, mmap_size_mb: int = 256):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(f"PRAGMA mmap_size={mmap_size_mb * 1024 * 1024}")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS payloads ("
+            "id INTEGER PRIMARY KEY, "
+            "text TEXT NOT NULL, "
+            "metadata TEXT, "
+            "vector BLOB, "
+            "asset_id INTEGER, "
+            "page INTEGER)"
+        )
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(payloads)")]
+        if "vector" not in columns:
+            self.connection.execute("ALTER TABLE payloads ADD COLUMN vector BLOB")
+        if "asset_id" not in columns:
+            self.connection.execute("ALTER TABLE payloads ADD COLUMN asset_id INTEGER")
+        if "page" not in columns:
+            self.connection.execute("ALTER TABLE payloads ADD COLUMN page INTEGER")
+            self.connection.execute("UPDATE payloads SET page = json_extract(metadata, '$.page') WHERE metadata IS NOT NULL")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_payloads_asset_id ON payloads (asset_id)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_payloads_page ON payloads (page)")
+        self.connection.commit()
+
+    def put_many(self, record_ids: List[int], texts: List[str], metadata: List[Optional[dict]],
+                 vectors: Optional[np.ndarray] = None, asset_ids: Optional[List[int]] = None):
+        if vectors is None:
+            vectors = [None] * len(record_ids)
+        if asset_ids is None:
+            asset_ids = [None] * len(record_ids)
+        rows = [
+            (
+                int(record_id),
+                text,
+                json.dumps(meta) if meta is not None else None,
+                np.asarray(vector, dtype='float32').tobytes() if vector is not None else None,
+                int(asset_id) if asset_id is not None else None,
+                meta.get("page") if isinstance(meta, dict) else None,
+            )
+            for record_id, text, meta, vector, asset_id in zip(record_ids, texts, metadata, vectors, asset_ids)
+        ]
+        with self.lock:
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO payloads (id, text, metadata, vector, asset_id, page) VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+
+    def delete_many(self, record_ids: List[int]) -> int:
+        record_ids = [int(record_id) for record_id in record_ids]
+        if not record_ids:
+            return 0
+        placeholders = ",".join("?" * len(record_ids))
+        with self.lock:
+            with self.connection:
+                cursor = self.connection.execute(f"DELETE FROM payloads WHERE id IN ({placeholders})", record_ids)
+        return cursor.rowcount
+
+    def get_existing_ids(self, record_ids: List[int]) -> List[int]:
+        record_ids = [int(record_id) for record_id in record_ids]
+        if not record_ids:
+            return []
+        placeholders = ",".join("?" * len(record_ids))
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT id FROM payloads WHERE id IN ({placeholders})", record_ids
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_ids_by_asset(self, asset_id: int) -> List[int]:
+        return self.get_filtered_ids({"asset_ids": [asset_id]})
+
+    def get_filtered_ids(self, filters: dict) -> List[int]:
+        # filters: {"asset_ids": [...], "pages": [...]}, conditions on different fields are AND-ed
+        conditions, values = [], []
+        for column, key in (("asset_id", "asset_ids"), ("page", "pages")):
+            if filters.get(key):
+                conditions.append(f"{column} IN ({','.join('?' * len(filters[key]))})")
+                values.extend(int(value) for value in filters[key])
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self.lock:
+            rows = self.connection.execute(f"SELECT id FROM payloads{where}", values).fetchall()
+        return [row[0] for row in rows]
+
+    def get_many(self, record_ids: List[int]) -> Dict[int, dict]:
+        record_ids = [int(record_id) for record_id in record_ids]
+        if not record_ids:
+            return {}
+        placeholders = ",".join("?" * len(record_ids))
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT id, text, metadata FROM payloads WHERE id IN ({placeholders})", record_ids
+            ).fetchall()
+        return {
+            row[0]: {"text": row[1], "metadata": json.loads(row[2]) if row[2] is not None else None}
+            for row in rows
+        }
+
+    def get_vectors(self, record_ids: List[int]) -> Dict[int, np.ndarray]:
+        record_ids = [int(record_id) for record_id in record_ids]
+        if not record_ids:
+            return {}
+        placeholders = ",".join("?" * len(record_ids))
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT id, vector FROM payloads WHERE id IN ({placeholders}) AND vector IS NOT NULL", record_ids
+            ).fetchall()
+        return {row[0]: np.frombuffer(row[1], dtype='float32') for row in rows}
+
+    def count(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM payloads").fetchone()[0]
+
+    def next_id(self) -> int:
+        with self.lock:
+            max_id = self.connection.execute("SELECT MAX(id) FROM payloads").fetchone()[0]
+        return 0 if max_id is None else max_id + 1
+
+    def import_id_map(self, id_map: dict):
+        # one-off migration from the legacy pickled {id: {"text", "metadata"}} map
+        record_ids = list(id_map.keys())
+        self.put_many(
+            record_ids=record_ids,
+            texts=[id_map[record_id].get("text", "") for record_id in record_ids],
+            metadata=[id_map[record_id].get("metadata") for record_id in record_ids],
+        )
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,117 @@
+import os
+import zipfile
+import threading
+import faiss
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ShardedIndex:
+    """
+    A collection's main index split into N faiss indexes by id (id % N).
+
+    Implements the part of the faiss index API the collection uses. Every query runs
+    against all shards in parallel and the per-shard top-k lists are merged, so one
+    large collection can use more cores than a single index search would.
+    """
+
+    # shared by all sharded collections, sized to the machine
+    search_executor = None
+    executor_lock = threading.Lock()
+
+    def __init__(self, shards: list):
+        self.shards = list(shards)
+
+    @classmethod
+    def get_search_executor(cls) -> ThreadPoolExecutor:
+        with cls.executor_lock:
+            if cls.search_executor is None:
+                cls.search_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="faiss-shard")
+            return cls.search_executor
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.shards)
+
+    @property
+    def d(self) -> int:
+        return self.shards[0].d
+
+    @property
+    def metric_type(self) -> int:
+        return self.shards[0].metric_type
+
+    @property
+    def ntotal(self) -> int:
+        return sum(shard.ntotal for shard in self.shards)
+
+    @property
+    def is_trained(self) -> bool:
+        return all(shard.is_trained for shard in self.shards)
+
+    def add_with_ids(self, vectors: np.ndarray, ids: np.ndarray):
+        ids = np.ascontiguousarray(ids, dtype='int64')
+        shard_numbers = ids % self.num_shards
+        for shard_number, shard in enumerate(self.shards):
+            in_shard = shard_numbers == shard_number
+            if in_shard.any():
+                shard.add_with_ids(np.ascontiguousarray(vectors[in_shard]), ids[in_shard])
+
+    def remove_ids(self, selector) -> int:
+        return sum(shard.remove_ids(selector) for shard in self.shards)
+
+    def search(self, queries: np.ndarray, k: int, params=None):
+        # empty shards are skipped, faiss crashes on batched searches over an empty flat index
+        shards = [shard for shard in self.shards if shard.ntotal > 0]
+        if not shards:
+            return np.zeros((len(queries), k), dtype='float32'), np.full((len(queries), k), -1, dtype='int64')
+
+        # faiss releases the GIL while searching, so the shards really run in parallel
+        executor = self.get_search_executor()
+        futures = [executor.submit(shard.search, queries, k, params=params) for shard in shards]
+        results = [future.result() for future in futures]
+        return merge_search_results(
+            [D for D, _ in results], [I for _, I in results], k, self.metric_type == faiss.METRIC_INNER_PRODUCT
+        )
+
+
+def merge_search_results(distances: list, ids: list, limit: int, higher_is_better: bool):
+    # merge per-index (n, k) result matrices into one global top-k per query
+    D = np.hstack(distances)
+    I = np.hstack(ids)
+    # empty slots (id -1) must sort last whatever the metric
+    sort_keys = np.where(I < 0, np.inf, -D if higher_is_better else D)
+    order = np.argsort(sort_keys, axis=1, kind='stable')[:, :limit]
+    return np.take_along_axis(D, order, axis=1), np.take_along_axis(I, order, axis=1)
+
+
+def copy_index(index):
+    if isinstance(index, ShardedIndex):
+        return ShardedIndex([faiss.clone_index(shard) for shard in index.shards])
+    return faiss.clone_index(index)
+
+
+def read_back_vectors(index):
+    # (ids, vectors) of an IDMap index over flat-decodable storage, e.g. the staging index
+    if isinstance(index, ShardedIndex):
+        parts = [read_back_vectors(shard) for shard in index.shards]
+        return np.concatenate([ids for ids, _ in parts]), np.vstack([vectors for _, vectors in parts])
+    ids = faiss.vector_to_array(index.id_map).astype('int64')
+    vectors = index.index.reconstruct_n(0, index.ntotal)
+    return ids, vectors
+
+
+def write_index_file(index, path: str):
+    if not isinstance(index, ShardedIndex):
+        faiss.write_index(index, path)
+        return
+    # all shards go into one file so the whole generation is swapped in by a single rename
+    with open(path, 'wb') as f:
+        np.savez(f, *[faiss.serialize_index(shard) for shard in index.shards])
+
+
+def read_index_file(path: str):
+    if not zipfile.is_zipfile(path):
+        return faiss.read_index(path)
+    with np.load(path) as shard_arrays:
+        return ShardedIndex([faiss.deserialize_index(shard_arrays[f"arr_{i}"]) for i in range(len(shard_arrays.files))])
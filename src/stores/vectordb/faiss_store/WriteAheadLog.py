@@ -0,0 +1,132 @@
+import os
+import uuid
+import struct
+import zlib
+import logging
+import threading
+import numpy as np
+from typing import Iterator, Tuple
+
+
+class WriteAheadLog:
+    """
+    Append-only log of the vectors added to / removed from a collection since its index
+    was last written.
+
+    The file starts with the epoch of the index the log applies to, bumped by every
+    compaction, and the name token of that index file. Each record is a header (op, count, dim), the int64 ids, the float32
+    vectors (none for removals) and a CRC32 of all of it; a torn or corrupt tail left by
+    a crash is dropped on replay.
+
+    Several processes append to the same log; callers hold the collection's file lock
+    around appends, replays and resets.
+    """
+
+    OP_ADD = 1
+    OP_REMOVE = 2
+
+    # logs written before epochs were introduced start directly with a record (op 1 or 2),
+    # WAL1 logs have an epoch but no index token
+    MAGIC = b"WAL2"
+    FILE_HEADER = struct.Struct("<4sQ16s")
+    LEGACY_MAGIC = b"WAL1"
+    LEGACY_FILE_HEADER = struct.Struct("<4sQ")
+    HEADER = struct.Struct("<BII")
+    CHECKSUM = struct.Struct("<I")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def append(self, op: int, ids: np.ndarray, vectors: np.ndarray = None) -> int:
+        # returns the offset the record ends at, i.e. how much of the log the caller has seen
+        ids = np.ascontiguousarray(ids, dtype='int64')
+        if vectors is None:
+            vectors = np.empty((len(ids), 0), dtype='float32')
+        vectors = np.ascontiguousarray(vectors, dtype='float32').reshape(len(ids), -1)
+        record = self.HEADER.pack(op, len(ids), vectors.shape[1]) + ids.tobytes() + vectors.tobytes()
+        record += self.CHECKSUM.pack(zlib.crc32(record))
+
+        with self.lock:
+            with open(self.path, 'ab') as f:
+                if f.tell() == 0:
+                    f.write(self.FILE_HEADER.pack(self.MAGIC, 0, b""))
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+                return f.tell()
+
+    def replay(self, offset: int = 0) -> Iterator[Tuple[int, np.ndarray, np.ndarray, int]]:
+        # records from `offset` on, each with the offset it ends at
+        if not os.path.exists(self.path):
+            return
+
+        with self.lock:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+
+        offset = max(offset, self.parse_header(data)[0])
+        while offset + self.HEADER.size <= len(data):
+            op, count, dim = self.HEADER.unpack_from(data, offset)
+            body_size = self.HEADER.size + count * 8 + count * dim * 4
+            end = offset + body_size + self.CHECKSUM.size
+            if end > len(data):
+                break
+            (checksum,) = self.CHECKSUM.unpack_from(data, offset + body_size)
+            if checksum != zlib.crc32(data[offset:offset + body_size]):
+                break
+
+            ids_start = offset + self.HEADER.size
+            vectors_start = ids_start + count * 8
+            ids = np.frombuffer(data, dtype='int64', count=count, offset=ids_start)
+            vectors = np.frombuffer(data, dtype='float32', count=count * dim, offset=vectors_start).reshape(count, dim)
+            yield op, ids, vectors, end
+            offset = end
+
+        if offset < len(data):
+            # Partial record from an interrupted write, drop it so new appends stay readable
+            self.logger.warning(f"Discarding {len(data) - offset} corrupt bytes at the end of {self.path}")
+            with self.lock:
+                with open(self.path, 'r+b') as f:
+                    f.truncate(offset)
+
+    def size_bytes(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def read_header(self) -> Tuple[int, int, str]:
+        # (header size, epoch, index token); a missing or legacy log has no header and epoch 0
+        try:
+            with open(self.path, 'rb') as f:
+                return self.parse_header(f.read(self.FILE_HEADER.size))
+        except FileNotFoundError:
+            return 0, 0, ""
+
+    def parse_header(self, data: bytes) -> Tuple[int, int, str]:
+        if data.startswith(self.MAGIC) and len(data) >= self.FILE_HEADER.size:
+            _, epoch, token = self.FILE_HEADER.unpack_from(data)
+            return self.FILE_HEADER.size, epoch, token.rstrip(b"\0").decode()
+        if data.startswith(self.LEGACY_MAGIC) and len(data) >= self.LEGACY_FILE_HEADER.size:
+            return self.LEGACY_FILE_HEADER.size, self.LEGACY_FILE_HEADER.unpack_from(data)[1], ""
+        return 0, 0, ""
+
+    def epoch(self) -> int:
+        return self.read_header()[1]
+
+    def has_records(self) -> bool:
+        return self.size_bytes() > self.read_header()[0]
+
+    def reset(self, epoch: int, token: str = "") -> int:
+        # replaced in one rename, so a crash leaves either the old log or the empty new one;
+        # the temporary name is unique so a stale one left by another process is never reused
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        with self.lock:
+            with open(tmp_path, 'wb') as f:
+                f.write(self.FILE_HEADER.pack(self.MAGIC, epoch, token.encode()))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        return self.FILE_HEADER.size
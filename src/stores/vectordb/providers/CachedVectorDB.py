@@ -0,0 +1,92 @@
+import logging
+from typing import List
+from ..AsyncVectorDBInterface import AsyncVectorDBInterface
+from ..SearchResultCache import SearchResultCache
+from ....models.db_schemes import RetrievedDocument
+
+
+class CachedVectorDB(AsyncVectorDBInterface):
+    """Serves repeated searches from a SearchResultCache keyed by the collection generation."""
+
+    def __init__(self, vector_db_client: AsyncVectorDBInterface, search_cache: SearchResultCache):
+        self.client = vector_db_client
+        self.search_cache = search_cache
+        self.logger = logging.getLogger(__name__)
+
+    async def connect(self):
+        return await self.client.connect()
+
+    async def disconnect(self):
+        return await self.client.disconnect()
+
+    async def is_collection_existed(self, collection_name: str) -> bool:
+        return await self.client.is_collection_existed(collection_name=collection_name)
+
+    async def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False,
+                                index_config: dict = None):
+        return await self.client.create_collection(collection_name=collection_name, embedding_size=embedding_size,
+                                                   do_reset=do_reset, index_config=index_config)
+
+    async def list_all_collections(self) -> List:
+        return await self.client.list_all_collections()
+
+    async def get_collection_info(self, collection_name: str) -> dict:
+        return await self.client.get_collection_info(collection_name=collection_name)
+
+    async def delete_collection(self, collection_name: str):
+        return await self.client.delete_collection(collection_name=collection_name)
+
+    async def get_collection_generation(self, collection_name: str):
+        return await self.client.get_collection_generation(collection_name=collection_name)
+
+    async def insert_one(self, collection_name: str, text: str, vector: list, metadata: dict = None
+    , record_id: str = None, asset_id: int = None) -> str:
+        return await self.client.insert_one(collection_name=collection_name, text=text, vector=vector,
+                                            metadata=metadata, record_id=record_id, asset_id=asset_id)
+
+    async def insert_many(self, collection_name: str, texts: list, vectors: list, metadata: list = None
+    , record_ids: list = None, batch_size: int = None, asset_ids: list = None):
+        return await self.client.insert_many(collection_name=collection_name, texts=texts, vectors=vectors,
+                                             metadata=metadata, record_ids=record_ids, batch_size=batch_size,
+                                             asset_ids=asset_ids)
+
+    async def delete_by_ids(self, collection_name: str, record_ids: list):
+        return await self.client.delete_by_ids(collection_name=collection_name, record_ids=record_ids)
+
+    async def delete_by_asset(self, collection_name: str, asset_id: int):
+        return await self.client.delete_by_asset(collection_name=collection_name, asset_id=asset_id)
+
+    async def search_by_vector(self, collection_name: str, vector: list, limit: int = 10,
+                               search_params: dict = None, filters: dict = None) -> List[RetrievedDocument]:
+        results = await self.search_by_vectors(collection_name=collection_name, vectors=[vector], limit=limit,
+                                               search_params=search_params, filters=filters)
+        if not results or not results[0]:
+            return None
+        return results[0]
+
+    async def search_by_vectors(self, collection_name: str, vectors: list, limit: int = 10,
+                                search_params: dict = None, filters: dict = None) -> List[List[RetrievedDocument]]:
+        # read before searching: a write landing in between can only make the cached result newer
+        generation = await self.client.get_collection_generation(collection_name=collection_name)
+        if generation is None:
+            return await self.client.search_by_vectors(collection_name=collection_name, vectors=vectors, limit=limit,
+                                                       search_params=search_params, filters=filters)
+
+        keys = [
+            self.search_cache.make_key(collection_name, generation, vector, limit, search_params, filters)
+            for vector in vectors
+        ]
+        results = [self.search_cache.get(key) for key in keys]
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            # only the queries not answered from the cache go to the vector DB
+            missing_results = await self.client.search_by_vectors(
+                collection_name=collection_name, vectors=[vectors[i] for i in missing], limit=limit,
+                search_params=search_params, filters=filters
+            )
+            if missing_results is None:
+                return None
+            for i, result in zip(missing, missing_results):
+                results[i] = result
+                self.search_cache.put(keys[i], result)
+        return results
@@ -1,25 +1,45 @@
 import os
+import json
 import faiss
 import pickle
 import numpy as np
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Tuple
 import uuid
 from ..VectorDBInterface import VectorDBInterface
 from ..VectorDBEnums import DistanceMethodEnums
 from ....models.db_schemes import RetrievedDocument
+from ..faiss_store.FaissCollection import FaissCollection
+from ..faiss_store.CollectionCache import CollectionCache
+from ..faiss_store.PayloadStore import PayloadStore
+from ..faiss_store.WriteAheadLog import WriteAheadLog
+from ..faiss_store.FileLock import FileLock
+from ..faiss_store.IndexBuilder import IndexBuilder
+from ..faiss_store.ShardedIndex import read_index_file, write_index_file
 import logging
 import shutil
 
 class FaissDB(VectorDBInterface):
-    def __init__(self, db_path: str, distance_method: str):
+    def __init__(self, db_path: str, distance_method: str, cache_max_memory_mb: int = None,
+                 wal_compaction_threshold_mb: int = 32, default_index_config: dict = None,
+                 default_search_params: dict = None):
         self.db_path = db_path
         self.distance_method = distance_method
-        self.index = None
-        self.id_map = {}
+        self.default_index_config = default_index_config or {}
+        self.default_search_params = default_search_params or {}
         self.lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
 
+        # opened collections stay resident and are shared across requests
+        cache_max_memory_bytes = cache_max_memory_mb * 1024 * 1024 if cache_max_memory_mb else None
+        self.collection_cache = CollectionCache(max_memory_bytes=cache_max_memory_bytes)
+
+        # inserts go to a write-ahead log, folded into the main index in the background
+        self.wal_compaction_threshold_bytes = (wal_compaction_threshold_mb or 32) * 1024 * 1024
+        self.compaction_executor = None
+        self.pending_compactions = set()
+
         if distance_method == DistanceMethodEnums.COSINE.value:
             self.metric = faiss.METRIC_INNER_PRODUCT
         elif distance_method == DistanceMethodEnums.EUCLIDEAN.value:
@@ -32,45 +52,141 @@ class FaissDB(VectorDBInterface):
     def connect(self):
         if not os.path.exists(self.db_path):
             os.makedirs(self.db_path)
+        self.compaction_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="faiss-compaction")
+        self.recover_collections()
         self.logger.info(f"Connected to FaissDB at path {self.db_path}")
 
     def disconnect(self):
-        self.index = None
-        self.id_map = {}
+        if self.compaction_executor is not None:
+            self.compaction_executor.shutdown(wait=True)
+            self.compaction_executor = None
+        # persist whatever is still only in the logs so the next start is fast
+        for collection_name in list(self.collection_cache.entries.keys()):
+            self.compact_collection(collection_name)
+        self.collection_cache.clear()
         self.logger.info("Disconnected from FaissDB")
 
+    def recover_collections(self):
+        # replay logs left behind by a crash and fold them into the main index
+        for collection_name in os.listdir(self.db_path):
+            _, index_path, _, wal_path = self.get_collection_paths(collection_name)
+            wal = WriteAheadLog(wal_path)
+            if os.path.exists(index_path) and wal.has_records():
+                self.logger.info(f"Replaying write-ahead log of collection '{collection_name}'")
+                self.compact_collection(collection_name)
+
+    def get_collection_paths(self, collection_name: str) -> Tuple[str, str, str, str]:
+        collection_path = os.path.join(self.db_path, collection_name)
+        index_path = os.path.join(collection_path, f"{collection_name}.index")
+        payload_path = os.path.join(collection_path, f"{collection_name}_payload.db")
+        wal_path = os.path.join(collection_path, f"{collection_name}.wal")
+        return collection_path, index_path, payload_path, wal_path
+
+    def get_collection_lock(self, collection_name: str) -> FileLock:
+        # taken by every process writing the collection's log or index
+        return FileLock(os.path.join(self.db_path, collection_name, f"{collection_name}.lock"))
+
+    def get_collection_config_path(self, collection_name: str) -> str:
+        return os.path.join(self.db_path, collection_name, f"{collection_name}_config.json")
+
+    def read_collection_config(self, collection_name: str) -> dict:
+        config_path = self.get_collection_config_path(collection_name)
+        if not os.path.exists(config_path):
+            # collections created before index configs were introduced are flat
+            return {}
+        with open(config_path, 'r') as f:
+            return json.load(f)
+
+    def load_collection(self, collection_name: str) -> FaissCollection:
+        collection_path, index_path, payload_path, wal_path = self.get_collection_paths(collection_name)
+        wal = WriteAheadLog(wal_path)
+        file_lock = self.get_collection_lock(collection_name)
+        # shared: loads don't exclude each other, but never see a compaction halfway
+        with file_lock.acquire(shared=True):
+            FaissCollection.finish_compaction(index_path, wal)
+            index = read_index_file(index_path)
+            index_builder = IndexBuilder(
+                dimension=index.d, metric=index.metric_type, config=self.read_collection_config(collection_name)
+            )
+            payload_store = PayloadStore(payload_path)
+
+            # Collections created before the payload store kept a pickled id map, migrate it once
+            legacy_id_map_path = os.path.join(collection_path, f"{collection_name}_id_map.pkl")
+            if os.path.exists(legacy_id_map_path):
+                with open(legacy_id_map_path, 'rb') as f:
+                    payload_store.import_id_map(pickle.load(f))
+                os.remove(legacy_id_map_path)
+                self.logger.info(f"Migrated id map of collection '{collection_name}' to the payload store")
+
+            self.logger.info(f"Loaded FAISS collection '{collection_name}' into memory ({index.ntotal} vectors)")
+            collection = FaissCollection(
+                name=collection_name,
+                index=index,
+                payload_store=payload_store,
+                index_path=index_path,
+                wal=wal,
+                index_builder=index_builder,
+                file_lock=file_lock
+            )
+        return collection
+
+    def get_collection(self, collection_name: str) -> FaissCollection:
+        return self.collection_cache.get_or_load(
+            collection_name, lambda: self.load_collection(collection_name)
+        )
+
+    def compact_collection(self, collection_name: str):
+        try:
+            with self.lock:
+                if not self.is_collection_existed(collection_name):
+                    return
+                collection = self.get_collection(collection_name)
+            with collection.lock:
+                collection.compact()
+            self.collection_cache.resize()
+        except Exception as e:
+            self.logger.error(f"Error compacting collection '{collection_name}': {e}")
+        finally:
+            self.pending_compactions.discard(collection_name)
+
+    def schedule_compaction(self, collection_name: str):
+        if self.compaction_executor is None or collection_name in self.pending_compactions:
+            return
+        self.pending_compactions.add(collection_name)
+        self.compaction_executor.submit(self.compact_collection, collection_name)
+
     def is_collection_existed(self, collection_name: str) -> bool:
         collection_path = os.path.join(self.db_path, collection_name)
         return os.path.exists(collection_path)
 
-    def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False):
-        collection_path = os.path.join(self.db_path, collection_name)
-        index_path = os.path.join(collection_path, f"{collection_name}.index")
-        id_map_path = os.path.join(collection_path, f"{collection_name}_id_map.pkl")
+    def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False,
+                          index_config: dict = None):
+        collection_path, index_path, payload_path, _ = self.get_collection_paths(collection_name)
 
         if do_reset and self.is_collection_existed(collection_name):
-            shutil.rmtree(collection_path)
-            if os.path.exists(index_path):
-                os.remove(index_path)
-            if os.path.exists(id_map_path):
-                os.remove(id_map_path)
+            self.delete_collection(collection_name)
 
         if not self.is_collection_existed(collection_name):
+            # per-collection settings override the defaults from the app settings
+            config = {**self.default_index_config}
+            config.update({key: value for key, value in (index_config or {}).items() if value is not None})
+
+            try:
+                index_builder = IndexBuilder(dimension=embedding_size, metric=self.metric, config=config)
+                faiss_index = index_builder.build_initial_index()
+            except Exception as e:
+                self.logger.error(f"Invalid index config for collection '{collection_name}': {e}")
+                return False
+
             os.makedirs(collection_path, exist_ok=True)
             with self.lock:
-                if self.distance_method == DistanceMethodEnums.COSINE.value or self.distance_method == DistanceMethodEnums.DOT.value:
-                    base_index = faiss.IndexFlatIP(embedding_size)
-                elif self.distance_method == DistanceMethodEnums.EUCLIDEAN.value:
-                    base_index = faiss.IndexFlatL2(embedding_size)
-                else:
-                    raise ValueError(f"Unsupported distance method: {self.distance_method}")
-                
-                # Wrap with IndexIDMap to support add_with_ids
-                faiss_index = faiss.IndexIDMap(base_index)
-
-                faiss.write_index(faiss_index, index_path)
-                with open(id_map_path, 'wb') as f:
-                    pickle.dump({}, f)
+                with open(self.get_collection_config_path(collection_name), 'w') as f:
+                    json.dump(config, f)
+                PayloadStore(payload_path).close()
+                # the index file marks the collection as loadable, so it is written last and atomically
+                write_index_file(faiss_index, f"{index_path}.tmp")
+                os.replace(f"{index_path}.tmp", index_path)
+            return True
 
     def list_all_collections(self):
         collections = os.listdir(self.db_path)
@@ -84,62 +200,56 @@ class FaissDB(VectorDBInterface):
         # return collections
 
     def get_collection_info(self, collection_name: str) -> dict:
-        collection_path = os.path.join(self.db_path, collection_name)
-        index_path = os.path.join(collection_path, f"{collection_name}.index")
         if not self.is_collection_existed(collection_name):
             raise ValueError(f"Collection '{collection_name}' does not exist")
 
-        index = faiss.read_index(index_path)
+        collection = self.get_collection(collection_name)
         return {
             "collection_name": collection_name,
-            "embedding_size": index.d,
-            "num_vectors": index.ntotal,
-            "distance_method": self.distance_method
+            "embedding_size": collection.index.d,
+            "num_vectors": collection.payload_store.count(),
+            "distance_method": self.distance_method,
+            "index_type": collection.index_builder.index_type,
+            "quantization": collection.index_builder.quantization,
+            "is_trained": not collection.is_staging,
+            "num_shards": collection.index_builder.num_shards
         }
     
     def delete_collection(self, collection_name: str):
-        collection_path = os.path.join(self.db_path, collection_name)
-        index_path = os.path.join(collection_path, f"{collection_name}.index")
-        id_map_path = os.path.join(collection_path, f"{collection_name}_id_map.pkl")
+        collection_path, _, _, _ = self.get_collection_paths(collection_name)
 
         if self.is_collection_existed(collection_name):
-            shutil.rmtree(collection_path)
-            if os.path.exists(index_path):
-                os.remove(index_path)
-            if os.path.exists(id_map_path):
-                os.remove(id_map_path)
+            with self.lock:
+                collection = self.collection_cache.get(collection_name)
+                if collection is not None:
+                    # stop a pending background compaction from writing into the removed folder
+                    with collection.lock:
+                        collection.deleted = True
+                # closes the payload store first, an open SQLite file can't be removed everywhere
+                self.collection_cache.invalidate(collection_name)
+                shutil.rmtree(collection_path)
             self.logger.info(f"Collection '{collection_name}' deleted")
         else:
             self.logger.warning(f"Collection '{collection_name}' does not exist")
 
-    def insert_one(self, collection_name, text, vector, metadata = None, record_id = None):
-        
-        try:
-            if not self.is_collection_existed(collection_name):
-                self.logger.error(f"Collection '{collection_name}' does not exist")
-                return False
-            with self.lock:
-                # Convert vector to numpy
-                vec = np.array([vector], dtype='float32')  # shape (1, dim)
-                # If you're using cosine similarity, you may normalize:
-                if self.distance_method == DistanceMethodEnums.COSINE.value:
-                    faiss.normalize_L2(vec)
-
-                # Add to FAISS index (with ID)
-                # We assume self.index is an IndexIDMap (or supports add_with_ids)
-                self.index.add_with_ids(vec, np.array([record_id], dtype='int64'))
-
-                # Store metadata
-                self.id_to_meta[record_id] = {
-                    "text": text,
-                    "metadata": metadata
-                }
-                return True
-        except Exception as e:
-            self.logger.error(f"Error inserting vector: {e}")
-            return False
-
-    def insert_many(self, collection_name: str, texts: list, vectors: list, metadata: list = None, record_ids: list = None, batch_size: int = 50):
+    def get_collection_generation(self, collection_name: str):
+        if not self.is_collection_existed(collection_name):
+            return None
+        # loading checks the files, so writes made by other processes reload the collection first
+        return self.get_collection(collection_name).generation
+
+    def insert_one(self, collection_name, text, vector, metadata = None, record_id = None, asset_id = None):
+        return self.insert_many(
+            collection_name=collection_name,
+            texts=[text],
+            vectors=[vector],
+            metadata=[metadata],
+            record_ids=[record_id],
+            asset_ids=[asset_id]
+        )
+
+    def insert_many(self, collection_name: str, texts: list, vectors: list, metadata: list = None, record_ids: list = None,
+                    batch_size: int = None, asset_ids: list = None):
         try:
             if not self.is_collection_existed(collection_name):
                 self.logger.error(f"Collection '{collection_name}' does not exist")
@@ -148,22 +258,8 @@ class FaissDB(VectorDBInterface):
                     metadata = [None] * len(texts)
             if record_ids is None:
                 record_ids = [None] * len(texts)
-
-            num = len(texts)
-            # Convert vectors to float32 numpy array once (for all) if you like
-            # But here we’ll batch convert per batch
-            
-            # Load index and metadata
-            collection_path = os.path.join(self.db_path, collection_name)
-            index_path = os.path.join(collection_path, f"{collection_name}.index")
-            id_map_path = os.path.join(collection_path, f"{collection_name}_id_map.pkl")
-            
-            index = faiss.read_index(index_path)
-            with open(id_map_path, 'rb') as f:
-                id_to_meta = pickle.load(f)
-            
-            if record_ids is None:
-                record_ids = list(range(len(id_to_meta), len(id_to_meta) + len(texts)))
+            if asset_ids is None:
+                asset_ids = [None] * len(texts)
 
             # Prepare numpy array
             arr = np.array(vectors, dtype='float32')
@@ -171,83 +267,153 @@ class FaissDB(VectorDBInterface):
                 faiss.normalize_L2(arr)
 
             with self.lock:
-                # Convert record_ids to numpy int64
-                ids_np = np.array(record_ids, dtype='int64')
-
-                # Add vectors to FAISS index
-                index.add_with_ids(arr, ids_np)
-
-                # Store metadata
-                for vid, txt, meta in zip(record_ids, texts, metadata):
-                    id_to_meta[vid] = {
-                        "text": txt,
-                        "metadata": meta
-                    }
-                
-                # Save updated index and metadata
-                faiss.write_index(index, index_path)
-                with open(id_map_path, 'wb') as f:
-                    pickle.dump(id_to_meta, f)
+                # Use the resident collection instead of reloading it from disk
+                collection = self.get_collection(collection_name)
+
+                with collection.lock:
+                    if any(record_id is None for record_id in record_ids):
+                        next_id = collection.payload_store.next_id()
+                        record_ids = list(range(next_id, next_id + len(texts)))
+
+                    # Convert record_ids to numpy int64
+                    ids_np = np.array(record_ids, dtype='int64')
+
+                    # Upsert: ids that are already stored get their old vector removed first
+                    existing_ids = collection.payload_store.get_existing_ids(record_ids)
+                    if existing_ids:
+                        collection.remove(np.array(existing_ids, dtype='int64'))
+
+                    # Append text and metadata to the payload store, quantized collections
+                    # also keep the original vectors there for exact rescoring
+                    stored_vectors = arr if collection.index_builder.is_lossy else None
+                    collection.payload_store.put_many(record_ids, texts, metadata, vectors=stored_vectors, asset_ids=asset_ids)
+
+                    # Append vectors to the write-ahead log, they are searchable right away
+                    # and the main index is only rewritten by the background compaction
+                    collection.add(ids_np, arr)
+                    needs_compaction = collection.needs_compaction(self.wal_compaction_threshold_bytes)
+
+                self.collection_cache.resize()
+
+            if needs_compaction:
+                self.schedule_compaction(collection_name)
 
             return True
         except Exception as e:
             self.logger.error(f"Error inserting vectors: {e}")
             return False
 
-    def search_by_vector(self, collection_name: str, vector: list, limit: int = 10) -> List[RetrievedDocument]:
+    def delete_by_ids(self, collection_name: str, record_ids: list):
+        try:
+            if not self.is_collection_existed(collection_name):
+                self.logger.error(f"Collection '{collection_name}' does not exist")
+                return False
 
-        q = np.array([vector], dtype='float32')
+            with self.lock:
+                collection = self.get_collection(collection_name)
 
-        # If your distance method is cosine, normalize the query vector
-        if self.distance_method == DistanceMethodEnums.COSINE.value:
-            faiss.normalize_L2(q)
+                with collection.lock:
+                    existing_ids = collection.payload_store.get_existing_ids(record_ids)
+                    if existing_ids:
+                        # masked out of searches right away, dropped from the index on compaction
+                        collection.remove(np.array(existing_ids, dtype='int64'))
+                        collection.payload_store.delete_many(existing_ids)
+                    needs_compaction = collection.needs_compaction(self.wal_compaction_threshold_bytes)
 
-        # Perform search: returns (distances, ids)
-        # distances: shape (1, limit)
-        # ids: shape (1, limit)
-        # Load index and metadata
-        collection_path = os.path.join(self.db_path, collection_name)
-        index_path = os.path.join(collection_path, f"{collection_name}.index")
-        id_map_path = os.path.join(collection_path, f"{collection_name}_id_map.pkl")
-        
-        index = faiss.read_index(index_path)
-        with open(id_map_path, 'rb') as f:
-            id_to_meta = pickle.load(f)
-            
-        D, I = index.search(q, limit)
-
-        # If no results or all invalid IDs
-        if I is None or len(I[0]) == 0:
-            return None
+            if needs_compaction:
+                self.schedule_compaction(collection_name)
 
-        results = []
-        for dist, vid in zip(D[0], I[0]):
-            if vid < 0:
-                # FAISS uses -1 or negative id to represent “no more results”
-                continue
-
-            # Get metadata / payload
-            meta = id_to_meta.get(int(vid))
-            if meta is None:
-                # If for some reason you have no metadata for that id, skip or handle
-                continue
-
-            text = meta.get("text", "")
-            other_meta = meta.get("metadata", None)
-
-            # similarity_score: depends on your distance method. For Euclidean, maybe you want to convert
-            score = float(dist)
-
-            # If using inner product / cosine, dist is similarity; if using L2, smaller is better.
-            # You might convert Euclidean distance to “score = 1 / (1 + dist)” or something, depending.
-            results.append(
-                RetrievedDocument(
-                    similarity_score=score,
-                    text=text
-                )
-            )
+            return True
+        except Exception as e:
+            self.logger.error(f"Error deleting vectors: {e}")
+            return False
+
+    def delete_by_asset(self, collection_name: str, asset_id: int):
+        if not self.is_collection_existed(collection_name):
+            self.logger.error(f"Collection '{collection_name}' does not exist")
+            return False
+
+        collection = self.get_collection(collection_name)
+        record_ids = collection.payload_store.get_ids_by_asset(asset_id)
+        return self.delete_by_ids(collection_name=collection_name, record_ids=record_ids)
 
-        if not results:
+    def search_by_vector(self, collection_name: str, vector: list, limit: int = 10,
+                         search_params: dict = None, filters: dict = None) -> List[RetrievedDocument]:
+        results = self.search_by_vectors(
+            collection_name=collection_name, vectors=[vector], limit=limit, search_params=search_params, filters=filters
+        )
+        if not results or not results[0]:
             return None
+        return results[0]
+
+    def search_by_vectors(self, collection_name: str, vectors: list, limit: int = 10,
+                          search_params: dict = None, filters: dict = None) -> List[List[RetrievedDocument]]:
+
+        try:
+            q = np.array(vectors, dtype='float32')
 
-        return results
+            # If your distance method is cosine, normalize the query vectors
+            if self.distance_method == DistanceMethodEnums.COSINE.value:
+                faiss.normalize_L2(q)
+
+            # Perform one matrix search for all queries: returns (distances, ids)
+            # distances: shape (num_queries, limit)
+            # ids: shape (num_queries, limit)
+            # The collection is served from memory, it is only read from disk on a cache miss
+            collection = self.get_collection(collection_name)
+            # per-request tunables (nprobe / ef_search / rescore) override the defaults from the app settings
+            params = {**self.default_search_params}
+            params.update({key: value for key, value in (search_params or {}).items() if value is not None})
+            # metadata filters are answered by the payload store's indexes and pushed into
+            # the faiss search as an id selector
+            allowed_ids = None
+            if filters and any(filters.values()):
+                allowed_ids = collection.payload_store.get_filtered_ids(filters)
+                if not allowed_ids:
+                    return [[] for _ in vectors]
+
+            # searches read an immutable snapshot, so they don't wait for writers or compaction
+            D, I = collection.search(q, limit, search_params=params, allowed_ids=allowed_ids)
+
+            # If no results or all invalid IDs
+            if I is None or I.size == 0:
+                return [[] for _ in vectors]
+
+            # Only the payloads of the returned ids are read from disk, once for all queries
+            id_to_meta = collection.payload_store.get_many(np.unique(I[I >= 0]))
+
+            results = []
+            for distances, ids in zip(D, I):
+                query_results = []
+                for dist, vid in zip(distances, ids):
+                    if vid < 0:
+                        # FAISS uses -1 or negative id to represent “no more results”
+                        continue
+
+                    # Get metadata / payload
+                    meta = id_to_meta.get(int(vid))
+                    if meta is None:
+                        # If for some reason you have no metadata for that id, skip or handle
+                        continue
+
+                    text = meta.get("text", "")
+                    other_meta = meta.get("metadata", None)
+
+                    # similarity_score: depends on your distance method. For Euclidean, maybe you want to convert
+                    score = float(dist)
+
+                    # If using inner product / cosine, dist is similarity; if using L2, smaller is better.
+                    # You might convert Euclidean distance to “score = 1 / (1 + dist)” or something, depending.
+                    query_results.append(
+                        RetrievedDocument(
+                            similarity_score=score,
+                            text=text,
+                            metadata=other_meta
+                        )
+                    )
+                results.append(query_results)
+
+            return results
+        except Exception as e:
+            self.logger.error(f"Error searching collection '{collection_name}': {e}")
+            return None
@@ -0,0 +1,365 @@
+import logging
+from typing import List
+from sqlalchemy import select, update, delete, func, text, bindparam, literal_column
+from pgvector.sqlalchemy import Vector
+from pydantic import ValidationError
+from ..AsyncVectorDBInterface import AsyncVectorDBInterface
+from ..VectorDBEnums import DistanceMethodEnums, FaissIndexTypeEnums
+from ....models.db_schemes import DataChunk, VectorCollection, RetrievedDocument
+
+
+class PGVectorDB(AsyncVectorDBInterface):
+    """
+    Keeps embeddings in data_chunks.chunk_embedding, next to the chunk text.
+
+    A collection is the chunks of one project (NlpController names it collection_{project_id})
+    registered in vector_collections. Its ANN index is a partial HNSW / IVFFlat index over
+    that project's rows on a cast to the collection's embedding size, so searches only
+    walk the project's own vectors and read the text in the same query.
+    """
+
+    # pgvector operator classes per distance
+    OPERATOR_CLASSES = {
+        DistanceMethodEnums.COSINE.value: "vector_cosine_ops",
+        DistanceMethodEnums.EUCLIDEAN.value: "vector_l2_ops",
+        DistanceMethodEnums.DOT.value: "vector_ip_ops",
+    }
+
+    def __init__(self, db_client, distance_method: str, default_index_config: dict = None,
+                 default_search_params: dict = None):
+        self.db_client = db_client
+        self.distance_method = distance_method
+        self.default_index_config = default_index_config or {}
+        self.default_search_params = default_search_params or {}
+        self.logger = logging.getLogger(__name__)
+
+    async def connect(self):
+        # the tables and the extension come from the alembic migrations, the engine belongs to the app
+        self.logger.info("Using pgvector on the application database")
+
+    async def disconnect(self):
+        self.logger.info("Disconnected from pgvector")
+
+    def get_project_id(self, collection_name: str) -> int:
+        return int(collection_name.rsplit("_", 1)[-1])
+
+    def get_index_name(self, collection_name: str) -> str:
+        return f"idx_chunk_embedding_{collection_name}"
+
+    def get_embedding_expression(self, embedding_size: int):
+        # must match the indexed expression for the planner to use the ANN index
+        return DataChunk.chunk_embedding.cast(Vector(embedding_size))
+
+    def get_project_condition(self, project_id: int):
+        # inlined rather than bound, a generic plan with a parameter can't use the partial index
+        return DataChunk.chunk_project_id == literal_column(str(int(project_id)))
+
+    async def get_collection_record(self, session, collection_name: str):
+        result = await session.execute(select(VectorCollection).where(VectorCollection.collection_name == collection_name))
+        return result.scalars().first()
+
+    async def is_collection_existed(self, collection_name: str) -> bool:
+        try:
+            async with self.db_client() as session:
+                async with session.begin():
+                    return await self.get_collection_record(session, collection_name) is not None
+        except Exception as e:
+            self.logger.error(f"Error checking collection existence: {e}")
+
+    async def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False,
+                                index_config: dict = None):
+        if do_reset and await self.is_collection_existed(collection_name):
+            await self.delete_collection(collection_name)
+
+        if await self.is_collection_existed(collection_name):
+            self.logger.info(f"Collection '{collection_name}' already exists")
+            return False
+
+        # per-collection settings override the defaults from the app settings
+        config = {**self.default_index_config}
+        config.update({key: value for key, value in (index_config or {}).items() if value is not None})
+        index_type = config.get("index_type") or FaissIndexTypeEnums.HNSW.value
+        if index_type not in [FaissIndexTypeEnums.FLAT.value, FaissIndexTypeEnums.IVF_FLAT.value, FaissIndexTypeEnums.HNSW.value]:
+            self.logger.error(f"Index type '{index_type}' is not supported by pgvector")
+            return False
+        config["index_type"] = index_type
+
+        try:
+            async with self.db_client() as session:
+                async with session.begin():
+                    session.add(VectorCollection(
+                        collection_name=collection_name,
+                        collection_project_id=self.get_project_id(collection_name),
+                        embedding_size=embedding_size,
+                        index_config=config
+                    ))
+                    # HNSW builds incrementally, IVFFlat waits for data to train its lists on
+                    if index_type == FaissIndexTypeEnums.HNSW.value:
+                        await session.execute(text(self.get_index_statement(collection_name, embedding_size, config)))
+            return True
+        except Exception as e:
+            self.logger.error(f"Error creating collection: {e}")
+            return False
+
+    def get_index_statement(self, collection_name: str, embedding_size: int, config: dict, num_vectors: int = 0) -> str:
+        project_id = self.get_project_id(collection_name)
+        operator_class = self.OPERATOR_CLASSES[self.distance_method]
+        if config["index_type"] == FaissIndexTypeEnums.HNSW.value:
+            method = "hnsw"
+            options = f"m = {int(config.get('hnsw_m') or 16)}, ef_construction = {int(config.get('hnsw_ef_construction') or 64)}"
+        else:
+            method = "ivfflat"
+            # pgvector's guideline is rows / 1000 lists
+            options = f"lists = {int(config.get('nlist') or max(1, num_vectors // 1000))}"
+        return (
+            f"CREATE INDEX IF NOT EXISTS {self.get_index_name(collection_name)} ON data_chunks "
+            f"USING {method} ((chunk_embedding::vector({int(embedding_size)})) {operator_class}) "
+            f"WITH ({options}) WHERE chunk_project_id = {project_id}"
+        )
+
+    async def bump_generation(self, session, collection: VectorCollection):
+        # same transaction as the write, the new generation becomes visible with the new vectors
+        await session.execute(
+            update(VectorCollection).where(VectorCollection.collection_id == collection.collection_id)
+            .values(collection_generation=VectorCollection.collection_generation + 1)
+        )
+
+    async def get_collection_generation(self, collection_name: str):
+        try:
+            async with self.db_client() as session:
+                async with session.begin():
+                    result = await session.execute(
+                        select(VectorCollection.collection_id, VectorCollection.collection_generation)
+                        .where(VectorCollection.collection_name == collection_name)
+                    )
+                    row = result.first()
+                    if row is None:
+                        return None
+                    # ids are never reused, so a re-created collection doesn't repeat a generation
+                    return f"{row.collection_id}:{row.collection_generation}"
+        except Exception as e:
+            self.logger.error(f"Error getting collection generation: {e}")
+
+    async def list_all_collections(self) -> List:
+        async with self.db_client() as session:
+            async with session.begin():
+                result = await session.execute(select(VectorCollection.collection_name))
+                return list(result.scalars().all())
+
+    async def count_vectors(self, session, project_id: int) -> int:
+        result = await session.execute(
+            select(func.count()).select_from(DataChunk)
+            .where(self.get_project_condition(project_id), DataChunk.chunk_embedding.isnot(None))
+        )
+        return result.scalar()
+
+    async def get_collection_info(self, collection_name: str) -> dict:
+        try:
+            async with self.db_client() as session:
+                async with session.begin():
+                    collection = await self.get_collection_record(session, collection_name)
+                    if collection is None:
+                        return None
+                    return {
+                        "collection_name": collection_name,
+                        "embedding_size": collection.embedding_size,
+                        "num_vectors": await self.count_vectors(session, collection.collection_project_id),
+                        "distance_method": self.distance_method,
+                        "index_type": collection.index_config.get("index_type"),
+                    }
+        except Exception as e:
+            self.logger.error(f"Error getting collection info: {e}")
+
+    async def delete_collection(self, collection_name: str):
+        try:
+            async with self.db_client() as session:
+                async with session.begin():
+                    collection = await self.get_collection_record(session, collection_name)
+                    if collection is None:
+                        return False
+                    await session.execute(
+                        update(DataChunk).where(self.get_project_condition(collection.collection_project_id))
+                        .values(chunk_embedding=None)
+                    )
+                    await session.execute(text(f"DROP INDEX IF EXISTS {self.get_index_name(collection_name)}"))
+                    await session.execute(delete(VectorCollection).where(VectorCollection.collection_name == collection_name))
+            return True
+        except Exception as e:
+            self.logger.error(f"Error deleting collection: {e}")
+            return False
+
+    async def insert_one(self, collection_name: str, text: str, vector: list, metadata: dict = None
+    , record_id: str = None, asset_id: int = None) -> str:
+        return await self.insert_many(
+            collection_name=collection_name,
+            texts=[text],
+            vectors=[vector],
+            metadata=[metadata],
+            record_ids=[record_id],
+            asset_ids=[asset_id]
+        )
+
+    async def insert_many(self, collection_name: str, texts: list, vectors: list, metadata: list = None
+    , record_ids: list = None, batch_size: int = None, asset_ids: list = None):
+        # text, metadata and asset already live on the chunk row, only the vector is written
+        if record_ids is None or any(record_id is None for record_id in record_ids):
+            self.logger.error("pgvector stores embeddings on existing chunks, record_ids must be chunk ids")
+            return False
+
+        try:
+            async with self.db_client() as session:
+                async with session.begin():
+                    collection = await self.get_collection_record(session, collection_name)
+                    if collection is None:
+                        self.logger.error(f"Collection '{collection_name}' does not exist")
+                        return False
+                    statement = (
+                        update(DataChunk.__table__)
+                        .where(
+                            DataChunk.chunk_id == bindparam("b_chunk_id"),
+                            DataChunk.chunk_project_id == collection.collection_project_id
+                        )
+                        .values(chunk_embedding=bindparam("b_embedding", type_=Vector(collection.embedding_size)))
+                    )
+                    # one transaction for all batches: the vectors become visible together
+                    batch_size = batch_size or 500
+                    for i in range(0, len(record_ids), batch_size):
+                        await session.execute(statement, [
+                            {"b_chunk_id": int(record_id), "b_embedding": vector}
+                            for record_id, vector in zip(record_ids[i:i + batch_size], vectors[i:i + batch_size])
+                        ])
+                    await self.bump_generation(session, collection)
+                    await self.build_deferred_index(session, collection)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error inserting vectors: {e}")
+            return False
+
+    async def build_deferred_index(self, session, collection: VectorCollection):
+        config = collection.index_config
+        if config.get("index_type") != FaissIndexTypeEnums.IVF_FLAT.value:
+            return
+        exists = await session.execute(
+            text("SELECT 1 FROM pg_indexes WHERE tablename = 'data_chunks' AND indexname = :index_name"),
+            {"index_name": self.get_index_name(collection.collection_name)}
+        )
+        if exists.first() is not None:
+            return
+        # IVFFlat lists are trained on the rows present at build time, exact search until then
+        num_vectors = await self.count_vectors(session, collection.collection_project_id)
+        if num_vectors >= (config.get("train_min_vectors") or 10000):
+            self.logger.info(f"Building IVFFlat index of collection '{collection.collection_name}' on {num_vectors} vectors")
+            await session.execute(text(self.get_index_statement(
+                collection.collection_name, collection.embedding_size, config, num_vectors=num_vectors
+            )))
+
+    async def clear_embeddings(self, collection_name: str, condition) -> bool:
+        try:
+            async with self.db_client() as session:
+                async with session.begin():
+                    collection = await self.get_collection_record(session, collection_name)
+                    if collection is None:
+                        self.logger.error(f"Collection '{collection_name}' does not exist")
+                        return False
+                    await session.execute(
+                        update(DataChunk)
+                        .where(self.get_project_condition(collection.collection_project_id), condition)
+                        .values(chunk_embedding=None)
+                    )
+                    await self.bump_generation(session, collection)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error deleting vectors: {e}")
+            return False
+
+    async def delete_by_ids(self, collection_name: str, record_ids: list):
+        return await self.clear_embeddings(collection_name, DataChunk.chunk_id.in_([int(record_id) for record_id in record_ids]))
+
+    async def delete_by_asset(self, collection_name: str, asset_id: int):
+        return await self.clear_embeddings(collection_name, DataChunk.chunk_asset_id == int(asset_id))
+
+    async def search_by_vector(self, collection_name: str, vector: list, limit: int = 10,
+                               search_params: dict = None, filters: dict = None) -> List[RetrievedDocument]:
+        results = await self.search_by_vectors(
+            collection_name=collection_name, vectors=[vector], limit=limit, search_params=search_params, filters=filters
+        )
+        if not results or not results[0]:
+            return None
+        return results[0]
+
+    def get_distance(self, embedding, vector):
+        if self.distance_method == DistanceMethodEnums.EUCLIDEAN.value:
+            return embedding.l2_distance(vector)
+        if self.distance_method == DistanceMethodEnums.DOT.value:
+            return embedding.max_inner_product(vector)
+        return embedding.cosine_distance(vector)
+
+    def get_similarity_score(self, distance: float) -> float:
+        # same scale as the other providers: similarity for cosine / dot, distance for L2
+        if self.distance_method == DistanceMethodEnums.EUCLIDEAN.value:
+            return distance
+        if self.distance_method == DistanceMethodEnums.DOT.value:
+            # <#> returns the negative inner product
+            return -distance
+        return 1 - distance
+
+    def build_documents(self, rows) -> List[RetrievedDocument]:
+        documents = []
+        for row in rows:
+            try:
+                documents.append(RetrievedDocument(
+                    similarity_score=self.get_similarity_score(row.distance),
+                    text=row.chunk_text,
+                    metadata=row.chunk_metadata,
+                ))
+            except ValidationError as e:
+                # one malformed row doesn't cost the caller the rest of the results
+                self.logger.warning(f"Skipping search result that can't be returned: {e}")
+        return documents
+
+    async def search_by_vectors(self, collection_name: str, vectors: list, limit: int = 10,
+                                search_params: dict = None, filters: dict = None) -> List[List[RetrievedDocument]]:
+        # per-request tunables override the defaults from the app settings
+        params = {**self.default_search_params}
+        params.update({key: value for key, value in (search_params or {}).items() if value is not None})
+
+        try:
+            async with self.db_client() as session:
+                async with session.begin():
+                    collection = await self.get_collection_record(session, collection_name)
+                    if collection is None:
+                        self.logger.error(f"Collection '{collection_name}' does not exist")
+                        return None
+
+                    # SET LOCAL only lasts for this transaction
+                    if params.get("ef_search"):
+                        await session.execute(text(f"SET LOCAL hnsw.ef_search = {int(params['ef_search'])}"))
+                    if params.get("nprobe"):
+                        await session.execute(text(f"SET LOCAL ivfflat.probes = {int(params['nprobe'])}"))
+
+                    conditions = [self.get_project_condition(collection.collection_project_id), DataChunk.chunk_embedding.isnot(None)]
+                    if filters and filters.get("asset_ids"):
+                        conditions.append(DataChunk.chunk_asset_id.in_(filters["asset_ids"]))
+                    if filters and filters.get("pages"):
+                        conditions.append(DataChunk.chunk_metadata["page"].as_integer().in_(filters["pages"]))
+                    if filters and any(filters.values()):
+                        # keep scanning the index until enough rows pass the filters
+                        await session.execute(text("SET LOCAL hnsw.iterative_scan = relaxed_order"))
+                        await session.execute(text("SET LOCAL ivfflat.iterative_scan = relaxed_order"))
+
+                    embedding = self.get_embedding_expression(collection.embedding_size)
+                    results = []
+                    for vector in vectors:
+                        distance = self.get_distance(embedding, vector)
+                        # one query returns the ranked chunks together with their text
+                        rows = await session.execute(
+                            select(DataChunk.chunk_text, DataChunk.chunk_metadata, distance.label("distance"))
+                            .where(*conditions)
+                            .order_by(distance)
+                            .limit(limit)
+                        )
+                        results.append(self.build_documents(rows))
+                    return results
+        except Exception as e:
+            self.logger.error(f"Error searching vectors: {e}")
+            return None
@@ -1,18 +1,33 @@
 from os import path
 from turtle import mode
 from ..VectorDBInterface import VectorDBInterface
-from ..VectorDBEnums import DistanceMethodEnums
+from ..VectorDBEnums import DistanceMethodEnums, QuantizationEnums
 from qdrant_client import models, QdrantClient
+import numpy as np
+import itertools
 import logging
+import uuid
 from typing import List
 from ....models.db_schemes import RetrievedDocument
 
 class QdrantDB(VectorDBInterface):
     
-    def __init__(self, db_path: str, distance_method: str):
+    def __init__(self, db_path: str, distance_method: str, default_index_config: dict = None,
+                 default_search_params: dict = None, url: str = None, upload_batch_size: int = 256,
+                 upload_parallel: int = 1, upload_wait: bool = True):
         self.db_path = db_path
+        # a Qdrant server takes precedence over the embedded store at db_path
+        self.url = url
+        self.upload_batch_size = upload_batch_size
+        self.upload_parallel = upload_parallel
+        self.upload_wait = upload_wait
         self.distance_method = None
         self.client = None
+        self.default_index_config = default_index_config or {}
+        self.default_search_params = default_search_params or {}
+        # collection name -> generation, bumped after every write made through this client
+        self.generations = {}
+        self.generation_counter = itertools.count(1)
 
         if distance_method == DistanceMethodEnums.COSINE.value:
             self.distance_method = models.Distance.COSINE
@@ -25,8 +40,12 @@ class QdrantDB(VectorDBInterface):
 
     def connect(self):
         try:
-            self.client = QdrantClient(path=self.db_path)
-            self.logger.info(f"Connected to Qdrant at path {self.db_path}")
+            if self.url:
+                self.client = QdrantClient(url=self.url)
+                self.logger.info(f"Connected to Qdrant at {self.url}")
+            else:
+                self.client = QdrantClient(path=self.db_path)
+                self.logger.info(f"Connected to Qdrant at path {self.db_path}")
         except Exception as e:
             self.logger.error(f"Failed to connect to Qdrant: {e}")
 
@@ -40,15 +59,38 @@ class QdrantDB(VectorDBInterface):
         except Exception as e:
             self.logger.error(f"Error checking collection existence: {e}")
 
-    def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False):
+    def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False,
+                          index_config: dict = None):
         try:
             if do_reset and self.is_collection_existed(collection_name):
                 _ = self.delete_collection(collection_name)
             if not self.is_collection_existed(collection_name):
+                # per-collection settings override the defaults from the app settings
+                config = {**self.default_index_config}
+                config.update({key: value for key, value in (index_config or {}).items() if value is not None})
+                quantization = config.get("quantization") or QuantizationEnums.NONE.value
+
                 _ =  self.client.create_collection(
                     collection_name=collection_name,
-                    vectors_config=models.VectorParams(size=embedding_size, distance=self.distance_method),
+                    vectors_config=models.VectorParams(
+                        size=embedding_size,
+                        distance=self.distance_method,
+                        datatype=models.Datatype.FLOAT16 if quantization == QuantizationEnums.FP16.value else None,
+                        # memory-mapped originals; quantized copies (always_ram) still serve the search
+                        on_disk=config.get("on_disk"),
+                    ),
+                    hnsw_config=self.get_hnsw_config(config),
+                    quantization_config=self.get_quantization_config(quantization),
+                    on_disk_payload=config.get("on_disk_payload"),
                 )
+                # deletes and search filters by asset / page use these fields
+                for field_name in ["asset_id", "metadata.page"]:
+                    _ = self.client.create_payload_index(
+                        collection_name=collection_name,
+                        field_name=field_name,
+                        field_schema=models.PayloadSchemaType.INTEGER,
+                    )
+                self.bump_generation(collection_name)
                 return True
             else:
                 self.logger.info(f"Collection '{collection_name}' already exists")
@@ -56,6 +98,62 @@ class QdrantDB(VectorDBInterface):
         except Exception as e:
             self.logger.error(f"Error creating collection: {e}")
 
+    def get_hnsw_config(self, config: dict):
+        if not config.get("hnsw_m") and not config.get("hnsw_ef_construction"):
+            return None
+        return models.HnswConfigDiff(m=config.get("hnsw_m"), ef_construct=config.get("hnsw_ef_construction"))
+
+    def get_quantization_config(self, quantization: str):
+        if quantization == QuantizationEnums.SQ8.value:
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if quantization == QuantizationEnums.PQ.value:
+            return models.ProductQuantization(
+                product=models.ProductQuantizationConfig(compression=models.CompressionRatio.X16, always_ram=True)
+            )
+        # FP16 is a storage datatype of the vectors themselves, not a quantization config
+        return None
+
+    def get_search_params(self, search_params: dict = None):
+        # per-request tunables override the defaults from the app settings
+        params = {**self.default_search_params}
+        params.update({key: value for key, value in (search_params or {}).items() if value is not None})
+
+        rescore_factor = params.get("rescore_factor") or 1
+        quantization_params = None
+        if params.get("rescore") is not False and rescore_factor > 1:
+            # over-fetch with the quantized vectors, re-rank with the original ones
+            quantization_params = models.QuantizationSearchParams(rescore=True, oversampling=float(rescore_factor))
+
+        if not params.get("ef_search") and quantization_params is None:
+            return None
+        # Qdrant always builds an HNSW index, ef_search maps onto its hnsw_ef
+        return models.SearchParams(hnsw_ef=params.get("ef_search"), quantization=quantization_params)
+
+    def get_search_filter(self, filters: dict = None):
+        # filters: {"asset_ids": [...], "pages": [...]}, conditions on different fields are AND-ed
+        if not filters:
+            return None
+        conditions = []
+        if filters.get("asset_ids"):
+            conditions.append(models.FieldCondition(key="asset_id", match=models.MatchAny(any=filters["asset_ids"])))
+        if filters.get("pages"):
+            conditions.append(models.FieldCondition(key="metadata.page", match=models.MatchAny(any=filters["pages"])))
+        return models.Filter(must=conditions) if conditions else None
+
+    def bump_generation(self, collection_name: str):
+        self.generations[collection_name] = next(self.generation_counter)
+
+    def get_collection_generation(self, collection_name: str):
+        # only the embedded store is owned by this process; a server also takes writes from
+        # other workers that can't be seen here, so its collections report no generation
+        if self.url or not self.is_collection_existed(collection_name):
+            return None
+        if collection_name not in self.generations:
+            self.bump_generation(collection_name)
+        return self.generations[collection_name]
+
     def list_all_collections(self) -> List:
         try:
             return self.client.get_collections()
@@ -72,14 +170,16 @@ class QdrantDB(VectorDBInterface):
     def delete_collection(self, collection_name: str):
         if self.is_collection_existed(collection_name):
             try:
-                return self.client.delete_collection(collection_name=collection_name)
+                is_deleted = self.client.delete_collection(collection_name=collection_name)
+                self.bump_generation(collection_name)
+                return is_deleted
             except Exception as e:
                 self.logger.error(f"Error deleting collection: {e}")
         else:
             self.logger.warning(f"Collection '{collection_name}' does not exist")
 
     def insert_one(self, collection_name: str, text: str, vector: list, metadata: dict = None
-    , record_id: str = None) -> str:
+    , record_id: str = None, asset_id: int = None) -> str:
         try:
             if not self.is_collection_existed(collection_name):
                 self.logger.error(f"Collection '{collection_name}' does not exist")
@@ -91,64 +191,112 @@ class QdrantDB(VectorDBInterface):
                     models.PointStruct(
                         id=record_id,
                         vector=vector,
-                        payload={"text": text, "metadata": metadata},
+                        payload={"text": text, "metadata": metadata, "asset_id": asset_id},
                     )
                 ],
             )
+            self.bump_generation(collection_name)
             return True
         except Exception as e:
             self.logger.error(f"Error inserting point: {e}")
             return False
 
-    def insert_many(self, collection_name: str, texts: list, vectors: list, metadata: list = None, record_ids: list = None, batch_size: int = 40):
+    def insert_many(self, collection_name: str, texts: list, vectors: list, metadata: list = None, record_ids: list = None,
+                    batch_size: int = None, asset_ids: list = None):
         if metadata is None:
             metadata = [None] * len(texts)
 
-        if record_ids is None:
-            record_ids = [None] * len(texts)
-
-        # Process the data in batches
-        for i in range(0, len(texts), batch_size):
-            # 1. BUILD THE BATCH FIRST
-            points_batch = []
-            
-            # Slice all data for the current batch
-            batch_end = i + batch_size
-            batch_ids = record_ids[i:batch_end]
-            batch_vectors = vectors[i:batch_end]
-            batch_texts = texts[i:batch_end]
-            batch_metadata = metadata[i:batch_end]
-
-            # Create PointStruct for each item in the batch
-            for j in range(len(batch_texts)):
-                points_batch.append(
-                    models.PointStruct(
-                        id=batch_ids[j],
-                        vector=batch_vectors[j],
-                        payload={"text": batch_texts[j], "metadata": batch_metadata[j]},
-                    )
-                )
+        if record_ids is None or any(record_id is None for record_id in record_ids):
+            record_ids = [str(uuid.uuid4()) for _ in texts]
 
-            # 2. MAKE ONE API CALL PER BATCH
-            try:
-                self.client.upsert( 
+        if asset_ids is None:
+            asset_ids = [None] * len(texts)
+
+        if len(texts) == 0:
+            return True
+
+        # one contiguous float32 matrix instead of a Python list per point
+        vectors = np.asarray(vectors, dtype=np.float32)
+        payloads = [
+            {"text": text, "metadata": meta, "asset_id": asset_id}
+            for text, meta, asset_id in zip(texts, metadata, asset_ids)
+        ]
+
+        try:
+            # batched bulk upload, spread over `parallel` worker processes against a server
+            self.client.upload_collection(
+                collection_name=collection_name,
+                vectors=vectors,
+                payload=payloads,
+                ids=record_ids,
+                batch_size=batch_size or self.upload_batch_size,
+                parallel=self.upload_parallel,
+                max_retries=3,
+                wait=self.upload_wait,
+            )
+            if not self.upload_wait:
+                # batches were only acknowledged; updates apply in order, so waiting on one
+                # last idempotent write guarantees every batch before it is searchable
+                self.client.upsert(
                     collection_name=collection_name,
-                    points=points_batch,
-                    wait=True
+                    points=[models.PointStruct(id=record_ids[-1], vector=vectors[-1].tolist(), payload=payloads[-1])],
+                    wait=True,
                 )
-            except Exception as e:
-                self.logger.error(f"Error inserting points batch starting at index {i}: {e}")
-                # 3. RETURN FALSE ONLY IF A BATCH FAILS
-                return False
+        except Exception as e:
+            self.logger.error(f"Error uploading {len(texts)} points: {e}")
+            return False
+        finally:
+            # also after a failure, some batches may have been written
+            self.bump_generation(collection_name)
 
-        # 4. RETURN TRUE AFTER ALL BATCHES ARE SUCCESSFULLY PROCESSED
         return True
 
-    def search_by_vector(self, collection_name: str, vector: list, limit: int = 10):
+    def delete_by_ids(self, collection_name: str, record_ids: list):
+        try:
+            if not self.is_collection_existed(collection_name):
+                self.logger.error(f"Collection '{collection_name}' does not exist")
+                return False
+
+            self.client.delete(
+                collection_name=collection_name,
+                points_selector=models.PointIdsList(points=record_ids),
+                wait=True,
+            )
+            self.bump_generation(collection_name)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error deleting points: {e}")
+            return False
+
+    def delete_by_asset(self, collection_name: str, asset_id: int):
+        try:
+            if not self.is_collection_existed(collection_name):
+                self.logger.error(f"Collection '{collection_name}' does not exist")
+                return False
+
+            self.client.delete(
+                collection_name=collection_name,
+                points_selector=models.FilterSelector(
+                    filter=models.Filter(
+                        must=[models.FieldCondition(key="asset_id", match=models.MatchValue(value=asset_id))]
+                    )
+                ),
+                wait=True,
+            )
+            self.bump_generation(collection_name)
+            return True
+        except Exception as e:
+            self.logger.error(f"Error deleting points of asset {asset_id}: {e}")
+            return False
+
+    def search_by_vector(self, collection_name: str, vector: list, limit: int = 10, search_params: dict = None,
+                         filters: dict = None):
         results = self.client.search(
             collection_name=collection_name,
             query_vector=vector,
             limit=limit,
+            search_params=self.get_search_params(search_params),
+            query_filter=self.get_search_filter(filters),
         )
         
 
@@ -157,6 +305,29 @@ class QdrantDB(VectorDBInterface):
         
         return [RetrievedDocument(
             similarity_score=result.score,
-            text=result.payload.get("text", "")
+            text=result.payload.get("text", ""),
+            metadata=result.payload.get("metadata")
 
         ) for result in results]
+
+    def search_by_vectors(self, collection_name: str, vectors: list, limit: int = 10, search_params: dict = None,
+                          filters: dict = None):
+        qdrant_search_params = self.get_search_params(search_params)
+        qdrant_filter = self.get_search_filter(filters)
+        batch_results = self.client.search_batch(
+            collection_name=collection_name,
+            requests=[
+                models.SearchRequest(vector=vector, limit=limit, params=qdrant_search_params, filter=qdrant_filter,
+                                     with_payload=True)
+                for vector in vectors
+            ],
+        )
+
+        return [
+            [RetrievedDocument(
+                similarity_score=result.score,
+                text=result.payload.get("text", ""),
+                metadata=result.payload.get("metadata")
+            ) for result in results]
+            for results in batch_results
+        ]
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List
+from ..AsyncVectorDBInterface import AsyncVectorDBInterface
+from ..VectorDBInterface import VectorDBInterface
+from ....models.db_schemes import RetrievedDocument
+
+
+class ThreadPoolVectorDB(AsyncVectorDBInterface):
+    """Runs a blocking vector DB provider on a bounded thread pool so the event loop stays free."""
+
+    def __init__(self, vector_db_client: VectorDBInterface, max_workers: int = 4):
+        self.client = vector_db_client
+        self.max_workers = max_workers
+        self.executor = None
+        self.logger = logging.getLogger(__name__)
+
+    async def run(self, method, *args, **kwargs):
+        if self.executor is None:
+            # the pool bounds how many blocking calls run at once, extra requests queue up here
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="vectordb")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(method, *args, **kwargs))
+
+    async def connect(self):
+        return await self.run(self.client.connect)
+
+    async def disconnect(self):
+        result = await self.run(self.client.disconnect)
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        return result
+
+    async def is_collection_existed(self, collection_name: str) -> bool:
+        return await self.run(self.client.is_collection_existed, collection_name=collection_name)
+
+    async def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False,
+                                index_config: dict = None):
+        return await self.run(self.client.create_collection, collection_name=collection_name,
+                              embedding_size=embedding_size, do_reset=do_reset, index_config=index_config)
+
+    async def list_all_collections(self) -> List:
+        return await self.run(self.client.list_all_collections)
+
+    async def get_collection_info(self, collection_name: str) -> dict:
+        return await self.run(self.client.get_collection_info, collection_name=collection_name)
+
+    async def delete_collection(self, collection_name: str):
+        return await self.run(self.client.delete_collection, collection_name=collection_name)
+
+    async def get_collection_generation(self, collection_name: str):
+        return await self.run(self.client.get_collection_generation, collection_name=collection_name)
+
+    async def insert_one(self, collection_name: str, text: str, vector: list, metadata: dict = None
+    , record_id: str = None, asset_id: int = None) -> str:
+        return await self.run(self.client.insert_one, collection_name=collection_name, text=text, vector=vector,
+                              metadata=metadata, record_id=record_id, asset_id=asset_id)
+
+    async def insert_many(self, collection_name: str, texts: list, vectors: list, metadata: list = None
+    , record_ids: list = None, batch_size: int = None, asset_ids: list = None):
+        return await self.run(self.client.insert_many, collection_name=collection_name, texts=texts, vectors=vectors,
+                              metadata=metadata, record_ids=record_ids, batch_size=batch_size, asset_ids=asset_ids)
+
+    async def delete_by_ids(self, collection_name: str, record_ids: list):
+        return await self.run(self.client.delete_by_ids, collection_name=collection_name, record_ids=record_ids)
+
+    async def delete_by_asset(self, collection_name: str, asset_id: int):
+        return await self.run(self.client.delete_by_asset, collection_name=collection_name, asset_id=asset_id)
+
+    async def search_by_vector(self, collection_name: str, vector: list, limit: int = 10,
+                               search_params: dict = None, filters: dict = None) -> List[RetrievedDocument]:
+        return await self.run(self.client.search_by_vector, collection_name=collection_name, vector=vector,
+                              limit=limit, search_params=search_params, filters=filters)
+
+    async def search_by_vectors(self, collection_name: str, vectors: list, limit: int = 10,
+                                search_params: dict = None, filters: dict = None) -> List[List[RetrievedDocument]]:
+        return await self.run(self.client.search_by_vectors, collection_name=collection_name, vectors=vectors,
+                              limit=limit, search_params=search_params, filters=filters)
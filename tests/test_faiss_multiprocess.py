@@ -0,0 +1,52 @@
+import multiprocessing
+import numpy as np
+from src.stores.vectordb.providers.FaissDB import FaissDB
+from src.stores.vectordb.VectorDBEnums import DistanceMethodEnums
+
+WORKERS = 4
+IDS_PER_WORKER = 300
+DIMENSION = 16
+
+
+def get_vectors(ids):
+    # deterministic per id, so every process can recompute what the others inserted
+    return np.stack([np.random.default_rng(vid).random(DIMENSION, dtype='float32') for vid in ids])
+
+
+def insert_worker(db_path: str, worker: int):
+    db = FaissDB(db_path=db_path, distance_method=DistanceMethodEnums.COSINE.value)
+    db.connect()
+    # a tiny threshold, so the workers keep compacting while the others append
+    db.wal_compaction_threshold_bytes = 4096
+
+    ids = list(range(worker * IDS_PER_WORKER, (worker + 1) * IDS_PER_WORKER))
+    for start in range(0, len(ids), 10):
+        batch = ids[start:start + 10]
+        assert db.insert_many("c", [f"text {vid}" for vid in batch], get_vectors(batch).tolist(), record_ids=batch)
+    db.disconnect()
+
+
+def test_concurrent_inserts_and_compactions_keep_every_vector(tmp_path):
+    db_path = str(tmp_path)
+    db = FaissDB(db_path=db_path, distance_method=DistanceMethodEnums.COSINE.value)
+    db.connect()
+    db.create_collection("c", DIMENSION)
+    db.disconnect()
+
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=insert_worker, args=(db_path, worker)) for worker in range(WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    db = FaissDB(db_path=db_path, distance_method=DistanceMethodEnums.COSINE.value)
+    db.connect()
+    ids = list(range(WORKERS * IDS_PER_WORKER))
+    assert db.get_collection("c").ntotal == len(ids)
+
+    results = db.search_by_vectors("c", get_vectors(ids).tolist(), limit=1)
+    found = [vid for vid, hits in zip(ids, results) if hits and hits[0].text == f"text {vid}"]
+    assert len(found) == len(ids)
+    db.disconnect()